@@ -1,9 +1,66 @@
-from typing import List
+import gzip
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from typing import List, Optional, TextIO, Tuple
 
 from dstack.backend.base import Backend
+from dstack.backend.base.logs import merge_log_events
 from dstack.core.job import JobHead
 from dstack.core.repo import RepoAddress
 
+LOGS_FLUSH_RATE_SECS = 0.1
+
+LOGS_BUFFER_SIZE = 64 * 1024
+
+EXPORT_BUFFER_SIZE = 1024 * 1024
+
+
+class LogWriter:
+    # Buffers log output instead of writing every line to the terminal. The buffer is flushed
+    # when it's full, and otherwise by a background thread, so no line waits longer than
+    # LOGS_FLUSH_RATE_SECS.
+    def __init__(self, out: TextIO = None):
+        self.out = out or sys.stdout
+        self._chunks = []
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+
+    def __enter__(self) -> "LogWriter":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stopped.set()
+        self._thread.join()
+        self.flush()
+
+    def write(self, s: str):
+        with self._lock:
+            self._chunks.append(s)
+            self._size += len(s)
+            if self._size < LOGS_BUFFER_SIZE:
+                return
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._chunks:
+                return
+            self.out.write("".join(self._chunks))
+            self._chunks = []
+            self._size = 0
+            self.out.flush()
+
+    def _flush_loop(self):
+        while not self._stopped.wait(LOGS_FLUSH_RATE_SECS):
+            self.flush()
+
 
 def poll_logs(
     backend: Backend,
@@ -13,9 +70,26 @@ def poll_logs(
     attach: bool,
     from_run: bool = False,
 ):
+    poll_backends_logs([(backend, job_heads)], repo_address, start_time, attach, from_run)
+
+
+def poll_backends_logs(
+    backends_job_heads: List[Tuple[Backend, List[JobHead]]],
+    repo_address: RepoAddress,
+    start_time: int,
+    attach: bool,
+    from_run: bool = False,
+):
+    # The logs of all backends are polled concurrently and shown in timestamp order
     try:
-        for event in backend.poll_logs(repo_address, job_heads, start_time, attach):
-            print(event.log_message)
+        with LogWriter() as writer:
+            for event in merge_log_events(
+                [
+                    backend.poll_logs(repo_address, job_heads, start_time, attach)
+                    for backend, job_heads in backends_job_heads
+                ]
+            ):
+                writer.write(event.log_message + "\n")
     except KeyboardInterrupt as e:
         if attach is True:
             # The only way to exit from the --attach is to Ctrl-C. So
@@ -23,3 +97,48 @@ def poll_logs(
             # KeyboardInterrupt propagate to the rest of the command.
             if from_run:
                 raise e
+
+
+class ExportStats:
+    def __init__(self, events: int, bytes_written: int, secs: float):
+        self.events = events
+        self.bytes_written = bytes_written
+        self.secs = secs
+
+
+def export_logs(
+    backends_job_heads: List[Tuple[Backend, List[JobHead]]],
+    repo_address: RepoAddress,
+    start_time: int,
+    end_time: Optional[int],
+    path: str,
+) -> ExportStats:
+    # Files ending with .gz get gzip-compressed NDJSON, other files get plain text. The logs of
+    # every backend come in timestamp order, so merging them keeps the file in order.
+    started_at = time.monotonic()
+    ndjson = path.endswith(".gz")
+    events = 0
+    if ndjson:
+        f = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    else:
+        f = open(path, "w", encoding="utf-8", buffering=EXPORT_BUFFER_SIZE)
+    with f:
+        for event in heapq.merge(
+            *[
+                backend.query_logs(repo_address, job_heads, start_time, end_time)
+                for backend, job_heads in backends_job_heads
+            ],
+            key=lambda e: e.timestamp,
+        ):
+            if ndjson:
+                record = {
+                    "timestamp": event.timestamp,
+                    "job_id": event.job_id,
+                    "source": event.log_source.value,
+                    "message": event.log_message,
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            else:
+                f.write(event.log_message + "\n")
+            events += 1
+    return ExportStats(events, os.path.getsize(path), time.monotonic() - started_at)
@@ -1,8 +1,9 @@
+import threading
 from pathlib import Path
 from typing import Dict, Generator, List, Optional, Tuple
 
 import boto3
-from botocore.client import BaseClient
+from botocore.client import BaseClient, Config
 
 from dstack.backend.aws import artifacts, config, logs, tags
 from dstack.backend.aws.compute import AWSCompute
@@ -15,6 +16,7 @@ from dstack.backend.base import repos as base_repos
 from dstack.backend.base import runs as base_runs
 from dstack.backend.base import secrets as base_secrets
 from dstack.backend.base import tags as base_tags
+from dstack.backend.base.cache import CachingStorage
 from dstack.core.artifact import Artifact
 from dstack.core.config import BackendConfig
 from dstack.core.error import ConfigError
@@ -33,6 +35,9 @@ class AwsBackend(RemoteBackend):
 
     def __init__(self, backend_config: Optional[BackendConfig] = None):
         super().__init__(backend_config)
+        self._session = None
+        self._clients: Dict[str, BaseClient] = {}
+        self._clients_lock = threading.Lock()
         if backend_config is None:
             self.backend_config = AWSConfig()
             try:
@@ -45,8 +50,8 @@ class AwsBackend(RemoteBackend):
             self.backend_config = backend_config
             self._loaded = True
 
-        self._storage = AWSStorage(
-            s3_client=self._s3_client(), bucket_name=self.backend_config.bucket_name
+        self._storage = CachingStorage(
+            AWSStorage(s3_client=self._s3_client(), bucket_name=self.backend_config.bucket_name)
         )
         self._compute = AWSCompute(
             ec2_client=self._ec2_client(),
@@ -81,11 +86,25 @@ class AwsBackend(RemoteBackend):
         return self._get_client("sts")
 
     def _get_client(self, client_name: str) -> BaseClient:
-        session = boto3.Session(
-            profile_name=self.backend_config.profile_name,
-            region_name=self.backend_config.region_name,
-        )
-        return session.client(client_name)
+        # Clients are thread-safe and keep their connection pools, so they are created once
+        # per backend. Sessions are not thread-safe, hence the lock.
+        with self._clients_lock:
+            client = self._clients.get(client_name)
+            if client is None:
+                if self._session is None:
+                    self._session = boto3.Session(
+                        profile_name=self.backend_config.profile_name,
+                        region_name=self.backend_config.region_name,
+                    )
+                client = self._session.client(
+                    client_name,
+                    config=Config(
+                        max_pool_connections=self.backend_config.max_pool_connections,
+                        retries={"mode": self.backend_config.retry_mode},
+                    ),
+                )
+                self._clients[client_name] = client
+            return client
 
     def configure(self):
         config.configure(
@@ -116,6 +135,9 @@ class AwsBackend(RemoteBackend):
     def stop_job(self, repo_address: RepoAddress, job_id: str, abort: bool):
         base_jobs.stop_job(self._storage, self._compute, repo_address, job_id, abort)
 
+    def stop_jobs(self, repo_address: RepoAddress, run_name: Optional[str], abort: bool):
+        base_jobs.stop_jobs(self._storage, self._compute, repo_address, run_name, abort)
+
     def list_job_heads(
         self, repo_address: RepoAddress, run_name: Optional[str] = None
     ) -> List[JobHead]:
@@ -124,23 +146,41 @@ class AwsBackend(RemoteBackend):
     def delete_job_head(self, repo_address: RepoAddress, job_id: str):
         base_jobs.delete_job_head(self._storage, repo_address, job_id)
 
+    def delete_job_heads(
+        self, repo_address: RepoAddress, run_name: Optional[str]
+    ) -> List[JobHead]:
+        job_heads = base_jobs.delete_job_heads(self._storage, repo_address, run_name)
+        base_runs.delete_run_name_claims(self._storage, list({h.run_name for h in job_heads}))
+        return job_heads
+
     def list_run_heads(
         self,
         repo_address: RepoAddress,
         run_name: Optional[str] = None,
         include_request_heads: bool = True,
     ) -> List[RunHead]:
-        job_heads = self.list_job_heads(repo_address, run_name)
-        return base_runs.get_run_heads(
-            self._storage, self._compute, job_heads, include_request_heads
+        return base_runs.list_run_heads(
+            self._storage, self._compute, repo_address, run_name, include_request_heads
         )
 
+    def iter_recent_job_heads(self, repo_address: RepoAddress) -> Generator[JobHead, None, None]:
+        return base_runs.iter_recent_job_heads(self._storage, repo_address)
+
+    def get_last_done_run_name(
+        self, repo_address: RepoAddress, workflow_name: str
+    ) -> Optional[str]:
+        return base_runs.get_last_done_run_name(self._storage, repo_address, workflow_name)
+
+    def reindex_runs(self, repo_address: RepoAddress) -> int:
+        return base_runs.reindex_runs(self._storage, repo_address)
+
     def poll_logs(
         self,
         repo_address: RepoAddress,
         job_heads: List[JobHead],
         start_time: int,
         attached: bool,
+        stopped: Optional[threading.Event] = None,
     ) -> Generator[LogEvent, None, None]:
         return logs.poll_logs(
             self._storage,
@@ -151,6 +191,24 @@ class AwsBackend(RemoteBackend):
             job_heads,
             start_time,
             attached,
+            stopped,
+        )
+
+    def query_logs(
+        self,
+        repo_address: RepoAddress,
+        job_heads: List[JobHead],
+        start_time: int,
+        end_time: Optional[int] = None,
+    ) -> Generator[LogEvent, None, None]:
+        return logs.query_logs(
+            self._storage,
+            self._logs_client(),
+            self.backend_config.bucket_name,
+            repo_address,
+            job_heads,
+            start_time,
+            end_time,
         )
 
     def list_run_artifact_files(
@@ -174,6 +232,7 @@ class AwsBackend(RemoteBackend):
             run_name,
             output_dir,
             output_job_dirs,
+            self.backend_config.transfer_max_workers,
         )
 
     def upload_job_artifact_files(
@@ -190,6 +249,7 @@ class AwsBackend(RemoteBackend):
             job_id=job_id,
             artifact_name=artifact_name,
             local_path=local_path,
+            max_workers=self.backend_config.transfer_max_workers,
         )
 
     def list_tag_heads(self, repo_address: RepoAddress) -> List[TagHead]:
@@ -218,9 +278,12 @@ class AwsBackend(RemoteBackend):
     ):
         tags.create_tag_from_local_dirs(
             self._storage,
+            self._s3_client(),
+            self.backend_config.bucket_name,
             repo_data,
             tag_name,
             local_dirs,
+            self.backend_config.transfer_max_workers,
         )
 
     def delete_tag_head(self, repo_address: RepoAddress, tag_head: TagHead):
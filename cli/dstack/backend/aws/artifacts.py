@@ -1,14 +1,29 @@
+import hashlib
+import json
 import os
+import threading
 from pathlib import Path
-from typing import Generator, List, Optional, Tuple
+from typing import Dict, Generator, List, Optional, Tuple
 
 from boto3.s3 import transfer
 from botocore.client import BaseClient
+from s3transfer.futures import TransferFuture
 from tqdm import tqdm
 
 from dstack.core.artifact import Artifact
 from dstack.core.repo import RepoAddress
 
+TRANSFER_MULTIPART_THRESHOLD = 16 * 1024 * 1024
+
+TRANSFER_MULTIPART_CHUNKSIZE = 16 * 1024 * 1024
+
+UPLOAD_CHECK_DONE_EVERY = 1000
+
+# Where the manifests of downloaded runs are kept, relative to the output directory
+MANIFESTS_DIR = ".manifests"
+
+MD5_CHUNK_SIZE = 1024 * 1024
+
 
 def dest_file_path(key: str, output_dir: Path, output_job_dirs: bool) -> Path:
     if output_dir:
@@ -25,40 +40,172 @@ def download_run_artifact_files(
     run_name: str,
     output_dir: Optional[str],
     output_job_dirs: bool,
+    max_workers: int,
 ):
     artifact_prefix = f"artifacts/{repo_address.path()}/{run_name},"
 
     output_path = Path(output_dir or os.getcwd())
 
-    total_size = 0
-    keys = []
-    paginator = s3_client.get_paginator("list_objects")
-    page_iterator = paginator.paginate(Bucket=bucket_name, Prefix=artifact_prefix)
-    for page in page_iterator:
-        for obj in page.get("Contents") or []:
-            key = obj["Key"]
-            total_size += obj["Size"]
-            if obj["Size"] > 0 and not key.endswith("/"):
-                keys.append(key)
+    # The manifest of a previous download tells which local files are still the listed
+    # objects, so that only new and changed files are downloaded again
+    manifest_path = output_path / MANIFESTS_DIR / f"{run_name}.json"
+    manifest = _load_manifest(manifest_path)
+    recorder = _ManifestRecorder(output_path)
 
-    downloader = transfer.S3Transfer(s3_client, transfer.TransferConfig(), transfer.OSUtils())
+    # Files are submitted as the pages are listed. The transfer manager downloads them and
+    # their parts concurrently, and blocks submitting once its queue is full.
+    created_dirs = set()
+    futures = []
+    try:
+        with tqdm(
+            total=0,
+            unit="B",
+            unit_scale=True,
+            unit_divisor=1024,
+            desc=f"Downloading artifacts",
+        ) as pbar:
+            progress = _ProgressSubscriber(pbar)
+            with transfer.create_transfer_manager(
+                s3_client, _transfer_config(max_workers)
+            ) as manager:
+                paginator = s3_client.get_paginator("list_objects")
+                page_iterator = paginator.paginate(Bucket=bucket_name, Prefix=artifact_prefix)
+                for page in page_iterator:
+                    for obj in page.get("Contents") or []:
+                        key = obj["Key"]
+                        if obj["Size"] == 0 or key.endswith("/"):
+                            continue
+                        file_path = dest_file_path(key, output_path, output_job_dirs)
+                        etag = obj["ETag"].strip('"')
+                        entry = manifest.get(recorder.relative_path(file_path))
+                        if _is_unchanged(file_path, obj["Size"], etag, entry):
+                            recorder.add(file_path, obj["Size"], etag)
+                            continue
+                        progress.add_total(obj["Size"])
+                        if file_path.parent not in created_dirs:
+                            file_path.parent.mkdir(parents=True, exist_ok=True)
+                            created_dirs.add(file_path.parent)
+                        recorder.expect(file_path, obj["Size"], etag)
+                        futures.append(
+                            manager.download(
+                                bucket_name,
+                                key,
+                                str(file_path),
+                                extra_args={},
+                                subscribers=[progress, recorder],
+                            )
+                        )
+                    # Completed downloads are checked as the listing goes, so that a failure
+                    # stops it early and the futures don't pile up
+                    futures = _check_done(futures)
+                for future in futures:
+                    future.result()
+    finally:
+        # Also after a failure, so that the files downloaded so far aren't downloaded again
+        _save_manifest(manifest_path, recorder.files)
 
-    # TODO: Make download files in parallel
-    with tqdm(
-        total=total_size,
-        unit="B",
-        unit_scale=True,
-        unit_divisor=1024,
-        desc=f"Downloading artifacts",
-    ) as pbar:
 
-        def callback(size):
-            pbar.update(size)
+def _is_unchanged(file_path: Path, size: int, etag: str, entry: Optional[List]) -> bool:
+    try:
+        stat = file_path.stat()
+    except FileNotFoundError:
+        return False
+    if stat.st_size != size:
+        return False
+    if entry == [size, etag, stat.st_mtime_ns]:
+        return True
+    # Without a matching manifest entry, the content is compared. That's possible only with
+    # ETags of single-part uploads, which are the MD5 of the content.
+    return "-" not in etag and _md5(file_path) == etag
+
+
+def _md5(file_path: Path) -> str:
+    md5 = hashlib.md5()
+    with file_path.open("rb") as f:
+        for chunk in iter(lambda: f.read(MD5_CHUNK_SIZE), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _load_manifest(path: Path) -> Dict[str, List]:
+    try:
+        with path.open() as f:
+            return json.load(f)["files"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return {}
+
+
+def _save_manifest(path: Path, files: Dict[str, List]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w") as f:
+        json.dump({"files": files}, f)
+    os.replace(tmp_path, path)
+
+
+class _ManifestRecorder(transfer.BaseSubscriber):
+    # Collects the manifest entries of the files that are in sync with the listed objects:
+    # the size and the ETag of the object, and the mtime of the local file
+    def __init__(self, output_path: Path):
+        self.files = {}
+        self._output_path = output_path
+        self._expected = {}
+        self._lock = threading.Lock()
+
+    def relative_path(self, file_path: Path) -> str:
+        return file_path.relative_to(self._output_path).as_posix()
 
-        for key in keys:
-            file_path = dest_file_path(key, output_path, output_job_dirs)
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            downloader.download_file(bucket_name, key, str(file_path), callback=callback)
+    def add(self, file_path: Path, size: int, etag: str):
+        entry = [size, etag, file_path.stat().st_mtime_ns]
+        with self._lock:
+            self.files[self.relative_path(file_path)] = entry
+
+    def expect(self, file_path: Path, size: int, etag: str):
+        with self._lock:
+            self._expected[str(file_path)] = (size, etag)
+
+    def on_done(self, future, **kwargs):
+        file_path = future.meta.call_args.fileobj
+        with self._lock:
+            size, etag = self._expected.pop(file_path)
+        try:
+            future.result()
+        except Exception:
+            return
+        self.add(Path(file_path), size, etag)
+
+
+def _transfer_config(max_workers: int) -> transfer.TransferConfig:
+    return transfer.TransferConfig(
+        multipart_threshold=TRANSFER_MULTIPART_THRESHOLD,
+        multipart_chunksize=TRANSFER_MULTIPART_CHUNKSIZE,
+        max_concurrency=max_workers,
+    )
+
+
+def _check_done(futures: List[TransferFuture]) -> List[TransferFuture]:
+    pending = []
+    for future in futures:
+        if future.done():
+            future.result()
+        else:
+            pending.append(future)
+    return pending
+
+
+class _ProgressSubscriber(transfer.BaseSubscriber):
+    # Aggregates the progress of concurrent transfers in one bar
+    def __init__(self, pbar: tqdm):
+        self._pbar = pbar
+        self._lock = threading.Lock()
+
+    def add_total(self, size: int):
+        with self._lock:
+            self._pbar.total += size
+
+    def on_progress(self, future, bytes_transferred: int, **kwargs):
+        with self._lock:
+            self._pbar.update(bytes_transferred)
 
 
 def list_run_artifact_files(
@@ -82,12 +229,6 @@ def list_run_artifact_files(
                 )
 
 
-def __remove_prefix(text, prefix):
-    if text.startswith(prefix):
-        return text[len(prefix) :]
-    return text
-
-
 def upload_job_artifact_files(
     s3_client: BaseClient,
     bucket_name: str,
@@ -95,41 +236,69 @@ def upload_job_artifact_files(
     job_id: str,
     artifact_name: str,
     local_path: Path,
+    max_workers: int,
 ):
-    total_size = 0
-    for root, sub_dirs, files in os.walk(local_path):
-        for filename in files:
-            file_path = os.path.join(root, filename)
-            file_size = os.path.getsize(file_path)
-            total_size += file_size
+    upload_artifacts_files(
+        s3_client,
+        bucket_name,
+        repo_address,
+        job_id,
+        [(artifact_name, local_path)],
+        f"Uploading artifact '{artifact_name}'",
+        max_workers,
+    )
 
-    uploader = transfer.S3Transfer(s3_client, transfer.TransferConfig(), transfer.OSUtils())
 
+def upload_artifacts_files(
+    s3_client: BaseClient,
+    bucket_name: str,
+    repo_address: RepoAddress,
+    job_id: str,
+    artifacts: List[Tuple[str, Path]],
+    desc: str,
+    max_workers: int,
+):
+    # The directories are walked once, and every file is submitted to the transfer manager as
+    # soon as it's found. Files below the multipart threshold are sent with a single PUT, larger
+    # ones in concurrent parts.
+    futures = []
     with tqdm(
-        total=total_size,
+        total=0,
         unit="B",
         unit_scale=True,
         unit_divisor=1024,
-        desc=f"Uploading artifact '{artifact_name}'",
+        desc=desc,
     ) as pbar:
+        progress = _ProgressSubscriber(pbar)
+        with transfer.create_transfer_manager(s3_client, _transfer_config(max_workers)) as manager:
+            for artifact_name, local_path in artifacts:
+                prefix = f"artifacts/{repo_address.path()}/{job_id}/{artifact_name}/"
+                for file_path, relative_path, size in _scan_files(local_path):
+                    progress.add_total(size)
+                    futures.append(
+                        manager.upload(
+                            file_path, bucket_name, prefix + relative_path, subscribers=[progress]
+                        )
+                    )
+                    if len(futures) % UPLOAD_CHECK_DONE_EVERY == 0:
+                        futures = _check_done(futures)
+            for future in futures:
+                future.result()
 
-        def callback(size):
-            pbar.update(size)
-
-        prefix = f"artifacts/{repo_address.path()}/{job_id}/{artifact_name}"
-        for root, sub_dirs, files in os.walk(local_path):
-            for filename in files:
-                file_path = Path(os.path.join(root, filename)).absolute()
 
-                key = prefix + __remove_prefix(
-                    file_path.as_posix(), local_path.absolute().as_posix()
-                )
-                uploader.upload_file(
-                    str(file_path),
-                    bucket_name,
-                    key,
-                    callback=callback,
-                )
+def _scan_files(path: Path) -> Generator[Tuple[str, str, int], None, None]:
+    # Yields the path, the relative path with forward slashes, and the size of every file.
+    # Like os.walk, doesn't descend into symlinked directories.
+    dirs = [(str(path), "")]
+    while dirs:
+        dir_path, relative_dir_path = dirs.pop()
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        dirs.append((entry.path, relative_dir_path + entry.name + "/"))
+                else:
+                    yield entry.path, relative_dir_path + entry.name, entry.stat().st_size
 
 
 def list_run_artifact_files_and_folders(
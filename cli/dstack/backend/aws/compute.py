@@ -1,4 +1,4 @@
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 from botocore.client import BaseClient
 
@@ -31,6 +31,14 @@ class AWSCompute(Compute):
             request_id=request_id,
         )
 
+    def get_request_heads(
+        self, jobs_and_request_ids: List[Tuple[Job, Optional[str]]]
+    ) -> List[RequestHead]:
+        return runners.get_request_heads(
+            ec2_client=self.ec2_client,
+            jobs_and_request_ids=jobs_and_request_ids,
+        )
+
     def get_instance_type(self, job: Job) -> Optional[InstanceType]:
         return runners._get_instance_type(
             ec2_client=self.ec2_client,
@@ -62,3 +70,10 @@ class AWSCompute(Compute):
             ec2_client=self.ec2_client,
             request_id=request_id,
         )
+
+    def stop_requests(self, instance_request_ids: List[str], spot_request_ids: List[str]):
+        runners.stop_requests(
+            ec2_client=self.ec2_client,
+            instance_ids=instance_request_ids,
+            spot_request_ids=spot_request_ids,
+        )
@@ -28,6 +28,14 @@ regions = [
 ]
 
 
+# Covers the worker pools of bulk storage operations and artifact transfers
+DEFAULT_MAX_POOL_CONNECTIONS = 32
+
+DEFAULT_RETRY_MODE = "standard"
+
+DEFAULT_TRANSFER_MAX_WORKERS = 16
+
+
 class AWSConfig(BackendConfig):
     NAME = "aws"
 
@@ -37,6 +45,9 @@ class AWSConfig(BackendConfig):
     region_name = None
     profile_name = None
     subnet_id = None
+    max_pool_connections = DEFAULT_MAX_POOL_CONNECTIONS
+    retry_mode = DEFAULT_RETRY_MODE
+    transfer_max_workers = DEFAULT_TRANSFER_MAX_WORKERS
 
     def __init__(self):
         super().__init__()
@@ -59,6 +70,13 @@ class AWSConfig(BackendConfig):
                 self.region_name = config_data.get("region") or os.getenv("AWS_DEFAULT_REGION")
                 self.bucket_name = config_data["bucket"]
                 self.subnet_id = config_data.get("subnet")
+                self.max_pool_connections = (
+                    config_data.get("max_pool_connections") or DEFAULT_MAX_POOL_CONNECTIONS
+                )
+                self.retry_mode = config_data.get("retry_mode") or DEFAULT_RETRY_MODE
+                self.transfer_max_workers = (
+                    config_data.get("transfer_max_workers") or DEFAULT_TRANSFER_MAX_WORKERS
+                )
         else:
             raise ConfigError()
 
@@ -73,6 +91,12 @@ class AWSConfig(BackendConfig):
                 config_data["profile"] = self.profile_name
             if self.subnet_id:
                 config_data["subnet"] = self.subnet_id
+            if self.max_pool_connections != DEFAULT_MAX_POOL_CONNECTIONS:
+                config_data["max_pool_connections"] = self.max_pool_connections
+            if self.retry_mode != DEFAULT_RETRY_MODE:
+                config_data["retry_mode"] = self.retry_mode
+            if self.transfer_max_workers != DEFAULT_TRANSFER_MAX_WORKERS:
+                config_data["transfer_max_workers"] = self.transfer_max_workers
             yaml.dump(config_data, f)
 
     def configure(self):
@@ -1,12 +1,15 @@
+import itertools
+import threading
 import time
-from collections import defaultdict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Full, Queue
 from typing import Any, Dict, Generator, List, Optional, Tuple
 
 from botocore.client import BaseClient
 
-from dstack.backend.base import jobs, runs
 from dstack.backend.base.compute import Compute
-from dstack.backend.base.logs import render_log_message
+from dstack.backend.base.logs import are_jobs_finished, render_log_message
 from dstack.backend.base.storage import Storage
 from dstack.core.job import JobHead
 from dstack.core.log_event import LogEvent, LogEventSource
@@ -14,65 +17,162 @@ from dstack.core.repo import RepoAddress
 
 WAIT_N_ONCE_FINISHED = 1
 
-CHECK_STATUS_EVERY_N = 3
+# While output is flowing, the stream is read again right away. While it's idle, the polling rate
+# backs off from MIN_POLL_LOGS_RATE_SECS to MAX_POLL_LOGS_RATE_SECS.
+MIN_POLL_LOGS_RATE_SECS = 0.5
 
-POLL_LOGS_RATE_SECS = 1
+MAX_POLL_LOGS_RATE_SECS = 8
 
+CHECK_STATUS_RATE_SECS = 10
 
-def _get_latest_events_and_timestamp(event_ids_per_timestamp):
-    if event_ids_per_timestamp:
-        newest_timestamp = max(event_ids_per_timestamp.keys())
-        event_ids_per_timestamp = defaultdict(
-            set, {newest_timestamp: event_ids_per_timestamp[newest_timestamp]}
-        )
-    return event_ids_per_timestamp
+# The time range is split into this many windows, unless they would get shorter than a minute
+EXPORT_WINDOWS = 32
+
+EXPORT_MIN_WINDOW_MILLIS = 60 * 1000
+
+EXPORT_MAX_WORKERS = 8
 
+EXPORT_WINDOW_PAGES = 4
 
-def _reset_filter_log_events_params(fle_kwargs, event_ids_per_timestamp):
-    if event_ids_per_timestamp:
-        fle_kwargs["startTime"] = max(event_ids_per_timestamp.keys())
-    fle_kwargs.pop("nextToken", None)
+EXPORT_PUT_TIMEOUT_SECS = 0.1
 
 
-def _filter_log_events_loop(
+def _get_log_events_loop(
     storage: Storage,
-    compute: Compute,
     logs_client: BaseClient,
     repo_address: RepoAddress,
     job_heads: List[JobHead],
-    filter_logs_events_kwargs: dict,
+    get_log_events_kwargs: dict,
+    stopped: threading.Event,
 ):
-    event_ids_per_timestamp = defaultdict(set)
-    counter = 0
     finished_counter = 0
-    while True:
-        response = logs_client.filter_log_events(**filter_logs_events_kwargs)
-        for event in response["events"]:
-            if event["eventId"] not in event_ids_per_timestamp[event["timestamp"]]:
-                event_ids_per_timestamp[event["timestamp"]].add(event["eventId"])
+    poll_rate = MIN_POLL_LOGS_RATE_SECS
+    check_status_at = time.monotonic() + CHECK_STATUS_RATE_SECS
+    event_count = 0
+    while not stopped.is_set():
+        try:
+            response = logs_client.get_log_events(**get_log_events_kwargs)
+        except Exception as e:
+            # The runner may not have created the stream yet
+            if not _is_error(e, "ResourceNotFoundException", "ThrottlingException"):
+                raise e
+            response = None
+        if response is not None:
+            for event in response["events"]:
+                # Events of get_log_events have no IDs
+                event_count += 1
+                event["eventId"] = f"{get_log_events_kwargs['logStreamName']}-{event_count}"
                 yield event
-        event_ids_per_timestamp = _get_latest_events_and_timestamp(event_ids_per_timestamp)
-        if "nextToken" in response:
-            filter_logs_events_kwargs["nextToken"] = response["nextToken"]
-        else:
-            _reset_filter_log_events_params(filter_logs_events_kwargs, event_ids_per_timestamp)
-            time.sleep(POLL_LOGS_RATE_SECS)
-            counter = counter + 1
-            if counter % CHECK_STATUS_EVERY_N == 0:
-                _job_heads = [
-                    jobs.get_job(storage, repo_address, job_head.job_id) for job_head in job_heads
-                ]
-                run = next(
-                    iter(
-                        runs.get_run_heads(
-                            storage, compute, _job_heads, include_request_heads=False
-                        )
-                    )
+            next_token = response["nextForwardToken"]
+            idle = get_log_events_kwargs.get("nextToken") == next_token
+            get_log_events_kwargs["nextToken"] = next_token
+            if not idle:
+                poll_rate = MIN_POLL_LOGS_RATE_SECS
+                continue
+        if time.monotonic() >= check_status_at or finished_counter > 0:
+            if are_jobs_finished(storage, repo_address, job_heads):
+                if finished_counter == WAIT_N_ONCE_FINISHED:
+                    break
+                finished_counter += 1
+                # The last events may still be on their way
+                poll_rate = MIN_POLL_LOGS_RATE_SECS
+            check_status_at = time.monotonic() + CHECK_STATUS_RATE_SECS
+        if stopped.wait(min(poll_rate, max(check_status_at - time.monotonic(), 0))):
+            break
+        poll_rate = min(poll_rate * 2, MAX_POLL_LOGS_RATE_SECS)
+
+
+def _is_error(e: Exception, *codes: str) -> bool:
+    return (
+        hasattr(e, "response")
+        and e.response.get("Error") is not None
+        and e.response["Error"].get("Code") in codes
+    )
+
+
+def query_logs(
+    storage: Storage,
+    logs_client: BaseClient,
+    bucket_name: str,
+    repo_address: RepoAddress,
+    job_heads: List[JobHead],
+    start_time: int,
+    end_time: Optional[int],
+) -> Generator[LogEvent, None, None]:
+    # The time range is split into windows that are fetched concurrently. The windows don't
+    # overlap, so yielding them one after another keeps the events in timestamp order.
+    run_name = job_heads[0].run_name
+    if end_time is None:
+        end_time = int(time.time() * 1000)
+    window_millis = max(
+        -(-(end_time + 1 - start_time) // EXPORT_WINDOWS), EXPORT_MIN_WINDOW_MILLIS
+    )
+    windows = [
+        (window_start, min(window_start + window_millis, end_time + 1) - 1)
+        for window_start in range(start_time, end_time + 1, window_millis)
+    ]
+
+    def fetch_window(window: Tuple[int, int], pages: Queue, stopped: threading.Event):
+        next_token = None
+        try:
+            while not stopped.is_set():
+                kwargs = _filter_logs_events_kwargs(
+                    bucket_name, repo_address, run_name, window[0], window[1], next_token
                 )
-                if run.status.is_finished():
-                    if finished_counter == WAIT_N_ONCE_FINISHED:
-                        break
-                    finished_counter += 1
+                try:
+                    response = logs_client.filter_log_events(**kwargs)
+                except Exception as e:
+                    if _is_error(e, "ResourceNotFoundException"):
+                        return
+                    raise e
+                _put_page(pages, response["events"], stopped)
+                next_token = response.get("nextToken")
+                if not next_token:
+                    return
+        finally:
+            _put_page(pages, None, stopped)
+
+    rewriters = {}
+    stopped = threading.Event()
+    with ThreadPoolExecutor(max_workers=EXPORT_MAX_WORKERS) as executor:
+        # Every window buffers only a few pages and only a few windows are fetched ahead, so that
+        # memory doesn't grow with the range
+        fetches = deque()
+        windows_iter = iter(windows)
+
+        def submit(window: Tuple[int, int]):
+            pages = Queue(maxsize=EXPORT_WINDOW_PAGES)
+            fetches.append((pages, executor.submit(fetch_window, window, pages, stopped)))
+
+        for window in itertools.islice(windows_iter, EXPORT_MAX_WORKERS * 2):
+            submit(window)
+        try:
+            while fetches:
+                pages, future = fetches[0]
+                events = pages.get()
+                if events is None:
+                    # Raises the error of the window, if any
+                    future.result()
+                    fetches.popleft()
+                    window = next(windows_iter, None)
+                    if window is not None:
+                        submit(window)
+                    continue
+                for event in events:
+                    yield render_log_message(storage, event, repo_address, rewriters)
+        finally:
+            stopped.set()
+            for _, future in fetches:
+                future.cancel()
+
+
+def _put_page(pages: Queue, events: Optional[List[Dict[str, Any]]], stopped: threading.Event):
+    while not stopped.is_set():
+        try:
+            pages.put(events, timeout=EXPORT_PUT_TIMEOUT_SECS)
+            return
+        except Full:
+            pass
 
 
 def create_log_group_if_not_exists(
@@ -102,6 +202,17 @@ def create_log_stream(logs_client: BaseClient, log_group_name: str, run_name: st
     logs_client.create_log_stream(logGroupName=log_group_name, logStreamName=run_name)
 
 
+def _get_log_events_kwargs(
+    bucket_name: str, repo_address: RepoAddress, run_name: str, start_time: int
+):
+    return {
+        "logGroupName": f"/dstack/jobs/{bucket_name}/{repo_address.path()}",
+        "logStreamName": run_name,
+        "startTime": start_time,
+        "startFromHead": True,
+    }
+
+
 def _filter_logs_events_kwargs(
     bucket_name: str,
     repo_address: RepoAddress,
@@ -132,32 +243,30 @@ def poll_logs(
     job_heads: List[JobHead],
     start_time: int,
     attached: bool,
+    stopped: Optional[threading.Event] = None,
 ) -> Generator[LogEvent, None, None]:
+    # The polling stops between two requests once `stopped` is set
     run_name = job_heads[0].run_name
     filter_logs_events_kwargs = _filter_logs_events_kwargs(
         bucket_name, repo_address, run_name, start_time, end_time=None, next_token=None
     )
-    job_host_names = {}
-    job_ports = {}
-    job_app_specs = {}
+    rewriters = {}
 
     try:
         if attached:
-            for event in _filter_log_events_loop(
+            for event in _get_log_events_loop(
                 storage,
-                compute,
                 logs_client,
                 repo_address,
                 job_heads,
-                filter_logs_events_kwargs,
+                _get_log_events_kwargs(bucket_name, repo_address, run_name, start_time),
+                stopped or threading.Event(),
             ):
                 yield render_log_message(
                     storage,
                     event,
                     repo_address,
-                    job_host_names,
-                    job_ports,
-                    job_app_specs,
+                    rewriters,
                 )
         else:
             paginator = logs_client.get_paginator("filter_log_events")
@@ -167,16 +276,10 @@ def poll_logs(
                         storage,
                         event,
                         repo_address,
-                        job_host_names,
-                        job_ports,
-                        job_app_specs,
+                        rewriters,
                     )
     except Exception as e:
-        if (
-            hasattr(e, "response")
-            and e.response.get("Error")
-            and e.response["Error"].get("Code") == "ResourceNotFoundException"
-        ):
+        if _is_error(e, "ResourceNotFoundException"):
             return
         else:
             raise e
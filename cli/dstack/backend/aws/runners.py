@@ -1,8 +1,9 @@
 import json
 import time
 from functools import cmp_to_key, reduce
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
+import botocore.exceptions
 import yaml
 from botocore.client import BaseClient
 
@@ -15,6 +16,9 @@ from dstack.core.runners import Gpu, Resources, Runner
 
 CREATE_INSTANCE_RETRY_RATE_SECS = 3
 
+# Stays well below the filter and URL limits of EC2 describe calls
+DESCRIBE_MAX_IDS = 200
+
 
 def _get_instance_types(ec2_client: BaseClient) -> List[InstanceType]:
     response = None
@@ -571,6 +575,37 @@ def _terminate_instance(ec2_client: BaseClient, request_id: str):
             raise e
 
 
+def stop_requests(ec2_client: BaseClient, instance_ids: List[str], spot_request_ids: List[str]):
+    # Cancels all spot requests with one call, and then terminates their instances together with
+    # the on-demand instances with another one
+    spot_request_ids = sorted(set(spot_request_ids))
+    instance_ids = list(instance_ids)
+    for i in range(0, len(spot_request_ids), DESCRIBE_MAX_IDS):
+        chunk = spot_request_ids[i : i + DESCRIBE_MAX_IDS]
+        _describe_chunk(
+            lambda ids: ec2_client.cancel_spot_instance_requests(SpotInstanceRequestIds=ids)[
+                "CancelledSpotInstanceRequests"
+            ],
+            chunk,
+            "InvalidSpotInstanceRequestID.NotFound",
+        )
+        response = ec2_client.describe_instances(
+            Filters=[
+                {"Name": "spot-instance-request-id", "Values": chunk},
+            ],
+        )
+        for reservation in response.get("Reservations") or []:
+            for instance in reservation.get("Instances") or []:
+                instance_ids.append(instance["InstanceId"])
+    instance_ids = sorted(set(instance_ids))
+    for i in range(0, len(instance_ids), DESCRIBE_MAX_IDS):
+        _describe_chunk(
+            lambda ids: ec2_client.terminate_instances(InstanceIds=ids)["TerminatingInstances"],
+            instance_ids[i : i + DESCRIBE_MAX_IDS],
+            "InvalidInstanceID.NotFound",
+        )
+
+
 def get_request_head(
     ec2_client: BaseClient,
     job: Job,
@@ -578,12 +613,7 @@ def get_request_head(
 ) -> RequestHead:
     interruptible = job.requirements and job.requirements.interruptible
     if request_id is None:
-        message = (
-            "The spot instance request ID is not specified"
-            if interruptible
-            else "The instance ID is not specified"
-        )
-        return RequestHead(job_id=job.job_id, status=RequestStatus.TERMINATED, message=message)
+        return _get_unspecified_request_head(job)
 
     if interruptible:
         try:
@@ -591,46 +621,7 @@ def get_request_head(
                 SpotInstanceRequestIds=[request_id]
             )
             if response.get("SpotInstanceRequests"):
-                status = response["SpotInstanceRequests"][0]["Status"]
-                if status["Code"] in [
-                    "fulfilled",
-                    "request-canceled-and-instance-running",
-                ]:
-                    request_status = RequestStatus.RUNNING
-                elif status["Code"] in [
-                    "not-scheduled-yet",
-                    "pending-evaluation",
-                    "pending-fulfillment",
-                ]:
-                    request_status = RequestStatus.PENDING
-                elif status["Code"] in [
-                    "capacity-not-available",
-                    "instance-stopped-no-capacity",
-                    "instance-terminated-by-price",
-                    "instance-stopped-by-price",
-                    "instance-terminated-no-capacity",
-                    "limit-exceeded",
-                    "price-too-low",
-                ]:
-                    request_status = RequestStatus.NO_CAPACITY
-                elif status["Code"] in [
-                    "instance-terminated-by-user",
-                    "instance-stopped-by-user",
-                    "canceled-before-fulfillment",
-                    "instance-terminated-by-schedule",
-                    "instance-terminated-by-service",
-                    "spot-instance-terminated-by-user",
-                    "marked-for-stop",
-                    "marked-for-termination",
-                ]:
-                    request_status = RequestStatus.TERMINATED
-                else:
-                    raise Exception(
-                        f"Unsupported EC2 spot instance request status code: {status['Code']}"
-                    )
-                return RequestHead(
-                    job_id=job.job_id, status=request_status, message=status.get("Message")
-                )
+                return _get_spot_request_head(job, response["SpotInstanceRequests"][0])
             else:
                 return RequestHead(
                     job_id=job.job_id, status=RequestStatus.TERMINATED, message=None
@@ -652,21 +643,7 @@ def get_request_head(
         try:
             response = ec2_client.describe_instances(InstanceIds=[request_id])
             if response.get("Reservations") and response["Reservations"][0].get("Instances"):
-                state = response["Reservations"][0]["Instances"][0]["State"]
-                if state["Name"] in ["running"]:
-                    request_status = RequestStatus.RUNNING
-                elif state["Name"] in ["pending"]:
-                    request_status = RequestStatus.PENDING
-                elif state["Name"] in [
-                    "shutting-down",
-                    "terminated",
-                    "stopping",
-                    "stopped",
-                ]:
-                    request_status = RequestStatus.TERMINATED
-                else:
-                    raise Exception(f"Unsupported EC2 instance state name: {state['Name']}")
-                return RequestHead(job_id=job.job_id, status=request_status, message=None)
+                return _get_instance_request_head(job, response["Reservations"][0]["Instances"][0])
             else:
                 return RequestHead(
                     job_id=job.job_id, status=RequestStatus.TERMINATED, message=None
@@ -684,3 +661,146 @@ def get_request_head(
                 )
             else:
                 raise e
+
+
+def get_request_heads(
+    ec2_client: BaseClient,
+    jobs_and_request_ids: List[Tuple[Job, Optional[str]]],
+) -> List[RequestHead]:
+    spot_request_ids = []
+    instance_ids = []
+    for job, request_id in jobs_and_request_ids:
+        if request_id is None:
+            continue
+        if job.requirements and job.requirements.interruptible:
+            spot_request_ids.append(request_id)
+        else:
+            instance_ids.append(request_id)
+    spot_requests = _describe_spot_instance_requests(ec2_client, spot_request_ids)
+    instances = _describe_instances(ec2_client, instance_ids)
+    request_heads = []
+    for job, request_id in jobs_and_request_ids:
+        if request_id is None:
+            request_heads.append(_get_unspecified_request_head(job))
+        elif request_id in spot_requests:
+            request_heads.append(_get_spot_request_head(job, spot_requests[request_id]))
+        elif request_id in instances:
+            request_heads.append(_get_instance_request_head(job, instances[request_id]))
+        else:
+            # Not in the batched response, e.g. because of a NotFound error
+            request_heads.append(get_request_head(ec2_client, job, request_id))
+    return request_heads
+
+
+def _describe_spot_instance_requests(
+    ec2_client: BaseClient, request_ids: List[str]
+) -> Dict[str, Dict]:
+    spot_requests = {}
+    request_ids = sorted(set(request_ids))
+    for i in range(0, len(request_ids), DESCRIBE_MAX_IDS):
+        for spot_request in _describe_chunk(
+            lambda ids: ec2_client.describe_spot_instance_requests(SpotInstanceRequestIds=ids)[
+                "SpotInstanceRequests"
+            ],
+            request_ids[i : i + DESCRIBE_MAX_IDS],
+            "InvalidSpotInstanceRequestID.NotFound",
+        ):
+            spot_requests[spot_request["SpotInstanceRequestId"]] = spot_request
+    return spot_requests
+
+
+def _describe_instances(ec2_client: BaseClient, instance_ids: List[str]) -> Dict[str, Dict]:
+    instances = {}
+    instance_ids = sorted(set(instance_ids))
+    for i in range(0, len(instance_ids), DESCRIBE_MAX_IDS):
+        for reservation in _describe_chunk(
+            lambda ids: ec2_client.describe_instances(InstanceIds=ids)["Reservations"],
+            instance_ids[i : i + DESCRIBE_MAX_IDS],
+            "InvalidInstanceID.NotFound",
+        ):
+            for instance in reservation.get("Instances") or []:
+                instances[instance["InstanceId"]] = instance
+    return instances
+
+
+def _describe_chunk(describe, ids: List[str], not_found_code: str) -> List[Dict]:
+    # A single unknown ID fails the whole call, so the chunk is split until the unknown IDs
+    # are isolated. They are left out and described one by one by the caller.
+    try:
+        return describe(ids)
+    except botocore.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] != not_found_code:
+            raise e
+        if len(ids) == 1:
+            return []
+        middle = len(ids) // 2
+        return _describe_chunk(describe, ids[:middle], not_found_code) + _describe_chunk(
+            describe, ids[middle:], not_found_code
+        )
+
+
+def _get_unspecified_request_head(job: Job) -> RequestHead:
+    interruptible = job.requirements and job.requirements.interruptible
+    message = (
+        "The spot instance request ID is not specified"
+        if interruptible
+        else "The instance ID is not specified"
+    )
+    return RequestHead(job_id=job.job_id, status=RequestStatus.TERMINATED, message=message)
+
+
+def _get_spot_request_head(job: Job, spot_request: Dict) -> RequestHead:
+    status = spot_request["Status"]
+    if status["Code"] in [
+        "fulfilled",
+        "request-canceled-and-instance-running",
+    ]:
+        request_status = RequestStatus.RUNNING
+    elif status["Code"] in [
+        "not-scheduled-yet",
+        "pending-evaluation",
+        "pending-fulfillment",
+    ]:
+        request_status = RequestStatus.PENDING
+    elif status["Code"] in [
+        "capacity-not-available",
+        "instance-stopped-no-capacity",
+        "instance-terminated-by-price",
+        "instance-stopped-by-price",
+        "instance-terminated-no-capacity",
+        "limit-exceeded",
+        "price-too-low",
+    ]:
+        request_status = RequestStatus.NO_CAPACITY
+    elif status["Code"] in [
+        "instance-terminated-by-user",
+        "instance-stopped-by-user",
+        "canceled-before-fulfillment",
+        "instance-terminated-by-schedule",
+        "instance-terminated-by-service",
+        "spot-instance-terminated-by-user",
+        "marked-for-stop",
+        "marked-for-termination",
+    ]:
+        request_status = RequestStatus.TERMINATED
+    else:
+        raise Exception(f"Unsupported EC2 spot instance request status code: {status['Code']}")
+    return RequestHead(job_id=job.job_id, status=request_status, message=status.get("Message"))
+
+
+def _get_instance_request_head(job: Job, instance: Dict) -> RequestHead:
+    state = instance["State"]
+    if state["Name"] in ["running"]:
+        request_status = RequestStatus.RUNNING
+    elif state["Name"] in ["pending"]:
+        request_status = RequestStatus.PENDING
+    elif state["Name"] in [
+        "shutting-down",
+        "terminated",
+        "stopping",
+        "stopped",
+    ]:
+        request_status = RequestStatus.TERMINATED
+    else:
+        raise Exception(f"Unsupported EC2 instance state name: {state['Name']}")
+    return RequestHead(job_id=job.job_id, status=request_status, message=None)
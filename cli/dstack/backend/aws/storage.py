@@ -1,10 +1,17 @@
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Generator, List, Optional, Tuple
 
 import botocore.exceptions
 from botocore.client import BaseClient
 
 from dstack.backend.base.storage import Storage
 
+MAX_WORKERS = 16
+
+DELETE_OBJECTS_MAX_KEYS = 1000
+
+LIST_OBJECTS_MAX_KEYS = 1000
+
 
 class AWSStorage(Storage):
     def __init__(self, s3_client: BaseClient, bucket_name: str):
@@ -19,6 +26,22 @@ class AWSStorage(Storage):
             Metadata=metadata if metadata is not None else {},
         )
 
+    def put_object_if_absent(self, key: str, content: str) -> bool:
+        # botocore supports conditional writes since 1.35.2, which requires Python 3.8
+        operation_model = self.s3_client.meta.service_model.operation_model("PutObject")
+        if "IfNoneMatch" not in operation_model.input_shape.members:
+            raise NotImplementedError("Conditional writes require botocore>=1.35.2")
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name, Key=key, Body=content, IfNoneMatch="*"
+            )
+        except botocore.exceptions.ClientError as e:
+            # ConditionalRequestConflict means a concurrent conditional write of the same key
+            if e.response["Error"]["Code"] in ["PreconditionFailed", "ConditionalRequestConflict"]:
+                return False
+            raise e
+        return True
+
     def get_object(self, key: str) -> Optional[str]:
         try:
             response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
@@ -28,14 +51,70 @@ class AWSStorage(Storage):
             raise e
         return response["Body"].read().decode()
 
+    def get_object_if_modified(
+        self, key: str, etag: Optional[str]
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        kwargs = {"Bucket": self.bucket_name, "Key": key}
+        if etag:
+            kwargs["IfNoneMatch"] = etag
+        try:
+            response = self.s3_client.get_object(**kwargs)
+        except botocore.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] == "NoSuchKey":
+                return True, None, None
+            if e.response["Error"]["Code"] in ["304", "NotModified"]:
+                return False, None, etag
+            raise e
+        return True, response["Body"].read().decode(), response.get("ETag")
+
     def delete_object(self, key: str):
         self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
 
-    def list_objects(self, keys_prefix: str) -> List[str]:
-        response = self.s3_client.list_objects_v2(Bucket=self.bucket_name, Prefix=keys_prefix)
-        if response["KeyCount"] == 0:
-            return []
-        object_keys = []
-        for obj_metadata in response["Contents"]:
-            object_keys.append(obj_metadata["Key"])
-        return object_keys
+    def iter_objects(
+        self,
+        keys_prefix: str,
+        start_after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Generator[str, None, None]:
+        kwargs = {"Bucket": self.bucket_name, "Prefix": keys_prefix}
+        if start_after:
+            kwargs["StartAfter"] = start_after
+        count = 0
+        while limit is None or count < limit:
+            if limit is not None:
+                kwargs["MaxKeys"] = min(LIST_OBJECTS_MAX_KEYS, limit - count)
+            response = self.s3_client.list_objects_v2(**kwargs)
+            for obj_metadata in response.get("Contents") or []:
+                count += 1
+                yield obj_metadata["Key"]
+            if not response.get("IsTruncated"):
+                break
+            kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+    def put_objects(self, objects: Dict[str, str]):
+        if len(objects) <= 1:
+            for key, content in objects.items():
+                self.put_object(key, content)
+            return
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(objects))) as executor:
+            # list() re-raises the first failed put
+            list(executor.map(lambda item: self.put_object(*item), objects.items()))
+
+    def get_objects(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        if len(keys) <= 1:
+            return {key: self.get_object(key) for key in keys}
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(keys))) as executor:
+            return dict(zip(keys, executor.map(self.get_object, keys)))
+
+    def delete_objects(self, keys: List[str]):
+        for i in range(0, len(keys), DELETE_OBJECTS_MAX_KEYS):
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={
+                    "Objects": [{"Key": key} for key in keys[i : i + DELETE_OBJECTS_MAX_KEYS]],
+                    "Quiet": True,
+                },
+            )
+            if response.get("Errors"):
+                error = response["Errors"][0]
+                raise Exception(f"Failed to delete {error['Key']}: {error['Message']}")
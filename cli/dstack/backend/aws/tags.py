@@ -3,9 +3,11 @@ import time
 from pathlib import Path
 from typing import List, Optional
 
+from botocore.client import BaseClient
+
 from dstack.backend.aws import artifacts
-from dstack.backend.aws.storage import AWSStorage
 from dstack.backend.base import BackendType, jobs, runs, tags
+from dstack.backend.base.storage import Storage
 from dstack.core.artifact import ArtifactHead, ArtifactSpec
 from dstack.core.job import Job, JobStatus
 from dstack.core.repo import LocalRepoData, RepoAddress
@@ -15,10 +17,13 @@ from dstack.core.tag import TagHead
 # TODO move this func to base backend after implementing
 # generic upload_job_artifact_files()
 def create_tag_from_local_dirs(
-    storage: AWSStorage,
+    storage: Storage,
+    s3_client: BaseClient,
+    bucket_name: str,
     repo_data: LocalRepoData,
     tag_name: str,
     local_dirs: List[str],
+    max_workers: int,
 ):
     local_paths = []
     tag_artifacts = []
@@ -32,7 +37,7 @@ def create_tag_from_local_dirs(
 
     run_name = runs.create_run(storage, repo_data, BackendType.REMOTE)
     job = Job(
-        job_id=None,
+        job_id=f"{run_name},,0",
         repo_data=repo_data,
         run_name=run_name,
         workflow_name=None,
@@ -58,15 +63,15 @@ def create_tag_from_local_dirs(
         tag_name=tag_name,
     )
     jobs.create_job(storage, job, create_head=False)
-    for index, local_path in enumerate(local_paths):
-        artifacts.upload_job_artifact_files(
-            storage.s3_client,
-            storage.bucket_name,
-            repo_data,
-            job.job_id,
-            tag_artifacts[index],
-            local_path,
-        )
+    artifacts.upload_artifacts_files(
+        s3_client,
+        bucket_name,
+        repo_data,
+        job.job_id,
+        list(zip(tag_artifacts, local_paths)),
+        f"Uploading tag '{tag_name}'",
+        max_workers,
+    )
     tag_head = TagHead(
         repo_address=repo_data,
         tag_name=tag_name,
@@ -1,4 +1,5 @@
 import sys
+import threading
 from abc import ABC, abstractmethod
 from enum import Enum
 from pathlib import Path
@@ -6,7 +7,7 @@ from typing import Generator, List, Optional
 
 from dstack.core.artifact import Artifact
 from dstack.core.config import BackendConfig
-from dstack.core.job import Job, JobHead
+from dstack.core.job import Job, JobHead, JobStatus
 from dstack.core.log_event import LogEvent
 from dstack.core.repo import RepoAddress, RepoCredentials, RepoData
 from dstack.core.run import RunHead
@@ -88,7 +89,9 @@ class Backend(ABC):
     def delete_job_head(self, repo_address: RepoAddress, job_id: str):
         pass
 
-    def delete_job_heads(self, repo_address: RepoAddress, run_name: Optional[str]):
+    def delete_job_heads(
+        self, repo_address: RepoAddress, run_name: Optional[str]
+    ) -> List[JobHead]:
         job_heads = []
         for job_head in self.list_job_heads(repo_address, run_name):
             if job_head.status.is_finished():
@@ -98,6 +101,7 @@ class Backend(ABC):
                     sys.exit("The run is not finished yet. Stop the run first.")
         for job_head in job_heads:
             self.delete_job_head(repo_address, job_head.job_id)
+        return job_heads
 
     @abstractmethod
     def list_run_heads(
@@ -108,6 +112,26 @@ class Backend(ABC):
     ) -> List[RunHead]:
         pass
 
+    def iter_recent_job_heads(self, repo_address: RepoAddress) -> Generator[JobHead, None, None]:
+        yield from sorted(
+            self.list_job_heads(repo_address), key=lambda j: j.submitted_at, reverse=True
+        )
+
+    def get_last_done_run_name(
+        self, repo_address: RepoAddress, workflow_name: str
+    ) -> Optional[str]:
+        return next(
+            (
+                job_head.run_name
+                for job_head in self.iter_recent_job_heads(repo_address)
+                if job_head.workflow_name == workflow_name and job_head.status == JobStatus.DONE
+            ),
+            None,
+        )
+
+    def reindex_runs(self, repo_address: RepoAddress) -> int:
+        return 0
+
     @abstractmethod
     def poll_logs(
         self,
@@ -115,9 +139,22 @@ class Backend(ABC):
         job_heads: List[JobHead],
         start_time: int,
         attached: bool,
+        stopped: Optional[threading.Event] = None,
     ) -> Generator[LogEvent, None, None]:
         pass
 
+    def query_logs(
+        self,
+        repo_address: RepoAddress,
+        job_heads: List[JobHead],
+        start_time: int,
+        end_time: Optional[int] = None,
+    ) -> Generator[LogEvent, None, None]:
+        # Logs in timestamp order, for backends that can't query time ranges
+        for event in self.poll_logs(repo_address, job_heads, start_time, attached=False):
+            if end_time is None or event.timestamp <= end_time:
+                yield event
+
     @abstractmethod
     def list_run_artifact_files(
         self, repo_address: RepoAddress, run_name: str
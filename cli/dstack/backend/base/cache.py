@@ -0,0 +1,237 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Generator, List, Optional, Tuple
+
+from dstack.backend.base.storage import Storage
+
+MAX_OBJECTS = 1024
+
+OBJECTS_TTL_SECS = 1
+
+LISTINGS_TTL_SECS = 1
+
+MAX_WORKERS = 16
+
+
+class _CachedObject:
+    def __init__(self, content: Optional[str], etag: Optional[str], fetched_at: float):
+        self.content = content
+        self.etag = etag
+        self.fetched_at = fetched_at
+
+
+class CachingStorage(Storage):
+    def __init__(
+        self,
+        storage: Storage,
+        max_objects: int = MAX_OBJECTS,
+        objects_ttl: float = OBJECTS_TTL_SECS,
+        listings_ttl: float = LISTINGS_TTL_SECS,
+    ):
+        self.storage = storage
+        self.max_objects = max_objects
+        self.objects_ttl = objects_ttl
+        self.listings_ttl = listings_ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._objects: "OrderedDict[str, _CachedObject]" = OrderedDict()
+        self._listings: Dict[str, Tuple[List[str], float]] = {}
+        # The number of listings of a prefix in progress and the count of writes under it since
+        # they started
+        self._fetches: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "objects": len(self._objects),
+            "listings": len(self._listings),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+            self._listings.clear()
+
+    def put_object(self, key: str, content: str, metadata: Optional[Dict] = None):
+        self.storage.put_object(key, content, metadata)
+        self._store(key, content, None)
+        self._invalidate_listings(key)
+
+    def put_object_if_absent(self, key: str, content: str) -> bool:
+        created = self.storage.put_object_if_absent(key, content)
+        if created:
+            self._store(key, content, None)
+        else:
+            self._forget(key)
+        self._invalidate_listings(key)
+        return created
+
+    def get_object(self, key: str) -> Optional[str]:
+        cached = self._lookup(key)
+        if cached is not None and self._is_fresh(cached):
+            return cached.content
+        return self._fetch(key, cached)
+
+    def delete_object(self, key: str):
+        self.storage.delete_object(key)
+        self._forget(key)
+        self._invalidate_listings(key)
+
+    def iter_objects(
+        self,
+        keys_prefix: str,
+        start_after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Generator[str, None, None]:
+        with self._lock:
+            listing = self._listings.get(keys_prefix)
+            if listing is not None and time.monotonic() - listing[1] >= self.listings_ttl:
+                listing = None
+            if listing is not None:
+                self.hits += 1
+        if listing is not None:
+            keys = [key for key in listing[0] if not start_after or key > start_after]
+            yield from keys[:limit] if limit is not None else keys
+            return
+        if start_after is not None or limit is not None:
+            # Partial listings are not cached
+            yield from self.storage.iter_objects(keys_prefix, start_after, limit)
+            return
+        # The keys are yielded as they are listed, so that callers that stop early don't list the
+        # whole prefix. Only a listing that was read to the end, without a write under its prefix
+        # meanwhile, is cached.
+        with self._lock:
+            self.misses += 1
+            fetch = self._fetches.setdefault(keys_prefix, [0, 0])
+            fetch[0] += 1
+            generation = fetch[1]
+        fetched_at = time.monotonic()
+        keys = []
+        completed = False
+        try:
+            for key in self.storage.iter_objects(keys_prefix):
+                keys.append(key)
+                yield key
+            completed = True
+        finally:
+            with self._lock:
+                fetch[0] -= 1
+                if fetch[0] == 0:
+                    del self._fetches[keys_prefix]
+                if completed and fetch[1] == generation:
+                    # Expired listings are dropped here, as they're only ever replaced or
+                    # invalidated
+                    for expired_prefix in [
+                        p
+                        for p, (_, at) in self._listings.items()
+                        if fetched_at - at >= self.listings_ttl
+                    ]:
+                        del self._listings[expired_prefix]
+                    self._listings[keys_prefix] = (keys, fetched_at)
+
+    def put_objects(self, objects: Dict[str, str]):
+        self.storage.put_objects(objects)
+        for key, content in objects.items():
+            self._store(key, content, None)
+            self._invalidate_listings(key)
+
+    def get_objects(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        objects = {}
+        missing_keys = []
+        stale_objects = {}
+        for key in keys:
+            cached = self._lookup(key)
+            if cached is None:
+                missing_keys.append(key)
+            elif self._is_fresh(cached):
+                objects[key] = cached.content
+            else:
+                stale_objects[key] = cached
+        if missing_keys:
+            with self._lock:
+                self.misses += len(missing_keys)
+            fetched_at = time.monotonic()
+            for key, content in self.storage.get_objects(missing_keys).items():
+                self._store(key, content, None, fetched_at)
+                objects[key] = content
+        if stale_objects:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(stale_objects))) as executor:
+                contents = executor.map(
+                    lambda item: self._fetch(*item), list(stale_objects.items())
+                )
+                objects.update(zip(stale_objects.keys(), contents))
+        return {key: objects[key] for key in keys}
+
+    def delete_objects(self, keys: List[str]):
+        self.storage.delete_objects(keys)
+        for key in keys:
+            self._forget(key)
+            self._invalidate_listings(key)
+
+    def get_object_if_modified(
+        self, key: str, etag: Optional[str]
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        return self.storage.get_object_if_modified(key, etag)
+
+    def _fetch(self, key: str, cached: Optional[_CachedObject]) -> Optional[str]:
+        fetched_at = time.monotonic()
+        if cached is not None and cached.etag is not None:
+            modified, content, etag = self.storage.get_object_if_modified(key, cached.etag)
+            if not modified:
+                with self._lock:
+                    self.revalidations += 1
+                self._store(key, cached.content, cached.etag, fetched_at)
+                return cached.content
+        else:
+            modified, content, etag = self.storage.get_object_if_modified(key, None)
+        with self._lock:
+            self.misses += 1
+        self._store(key, content, etag, fetched_at)
+        return content
+
+    def _lookup(self, key: str) -> Optional[_CachedObject]:
+        with self._lock:
+            cached = self._objects.get(key)
+            if cached is not None:
+                self._objects.move_to_end(key)
+            return cached
+
+    def _is_fresh(self, cached: _CachedObject) -> bool:
+        if time.monotonic() - cached.fetched_at < self.objects_ttl:
+            with self._lock:
+                self.hits += 1
+            return True
+        return False
+
+    def _store(
+        self,
+        key: str,
+        content: Optional[str],
+        etag: Optional[str],
+        fetched_at: Optional[float] = None,
+    ):
+        with self._lock:
+            self._objects[key] = _CachedObject(
+                content, etag, fetched_at if fetched_at is not None else time.monotonic()
+            )
+            self._objects.move_to_end(key)
+            while len(self._objects) > self.max_objects:
+                self._objects.popitem(last=False)
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._objects.pop(key, None)
+
+    def _invalidate_listings(self, key: str):
+        with self._lock:
+            for keys_prefix in [p for p in self._listings if key.startswith(p)]:
+                del self._listings[keys_prefix]
+            for keys_prefix, fetch in self._fetches.items():
+                if key.startswith(keys_prefix):
+                    fetch[1] += 1
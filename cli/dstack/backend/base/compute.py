@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 from dstack.core.instance import InstanceType
 from dstack.core.job import Job, Requirements
@@ -11,6 +11,11 @@ class Compute(ABC):
     def get_request_head(self, job: Job, request_id: Optional[str]) -> RequestHead:
         pass
 
+    def get_request_heads(
+        self, jobs_and_request_ids: List[Tuple[Job, Optional[str]]]
+    ) -> List[RequestHead]:
+        return [self.get_request_head(job, request_id) for job, request_id in jobs_and_request_ids]
+
     @abstractmethod
     def get_instance_type(self, job: Job) -> Optional[InstanceType]:
         pass
@@ -26,3 +31,9 @@ class Compute(ABC):
     @abstractmethod
     def cancel_spot_request(self, request_id: str):
         pass
+
+    def stop_requests(self, instance_request_ids: List[str], spot_request_ids: List[str]):
+        for request_id in instance_request_ids:
+            self.terminate_instance(request_id)
+        for request_id in spot_request_ids:
+            self.cancel_spot_request(request_id)
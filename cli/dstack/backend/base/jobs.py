@@ -1,10 +1,10 @@
+import sys
 import uuid
-from typing import List, Optional
+from typing import Generator, List, Optional
 
-import yaml
-
-from dstack.backend.base import runners
+from dstack.backend.base import manifests, runners
 from dstack.backend.base.compute import Compute
+from dstack.backend.base.serialization import dump_object, load_object
 from dstack.backend.base.storage import Storage
 from dstack.core.job import Job, JobHead, JobStatus
 from dstack.core.repo import RepoAddress
@@ -20,27 +20,65 @@ def create_job(
     if create_head:
         storage.put_object(key=_get_job_head_filename(job), content="")
     storage.put_object(
-        key=_get_job_filename(job.repo_address, job.job_id), content=yaml.dump(job.serialize())
+        key=_get_job_filename(job.repo_address, job.job_id), content=dump_object(job.serialize())
     )
+    if create_head:
+        manifests.update_manifests(storage, [_get_job_head(job)], create=True)
 
 
 def get_job(storage: Storage, repo_address: RepoAddress, job_id: str) -> Optional[Job]:
     obj = storage.get_object(_get_job_filename(repo_address, job_id))
     if obj is None:
         return None
-    job = Job.unserialize(yaml.load(obj, yaml.FullLoader))
+    job = Job.unserialize(load_object(obj))
     return job
 
 
+def get_jobs(storage: Storage, repo_address: RepoAddress, job_ids: List[str]) -> List[Job]:
+    objs = storage.get_objects([_get_job_filename(repo_address, job_id) for job_id in job_ids])
+    return [Job.unserialize(load_object(obj)) for obj in objs.values() if obj]
+
+
 def update_job(storage: Storage, job: Job):
-    job_head_key_prefix = _get_job_head_filename_prefix(job.repo_address, job.job_id)
-    job_keys = storage.list_objects(job_head_key_prefix)
-    for key in job_keys:
-        storage.delete_object(key)
-    storage.put_object(key=_get_job_head_filename(job), content="")
-    storage.put_object(
-        key=_get_job_filename(job.repo_address, job.job_id), content=yaml.dump(job.serialize())
-    )
+    update_jobs(storage, [job])
+
+
+def update_jobs(storage: Storage, jobs: List[Job]):
+    # Job heads are rewritten only if their keys change, e.g. with the status. Run manifests are
+    # left as they are, like when the runner updates a job head: the manifests of unfinished runs
+    # aren't read, and are rewritten once the runs have finished.
+    job_head_keys = {job.job_id: _get_job_head_filename(job) for job in jobs}
+    jobs_by_run_prefix = {}
+    for job in jobs:
+        run_prefix = _get_job_heads_filenames_prefix(job.repo_address, job.run_name)
+        jobs_by_run_prefix.setdefault(run_prefix, []).append(job)
+    stale_job_head_keys = []
+    unchanged_job_ids = set()
+    for run_prefix, run_jobs in jobs_by_run_prefix.items():
+        # A single job is looked up by its own prefix, several jobs by the run prefix
+        if len(run_jobs) == 1:
+            keys_prefix = _get_job_head_filename_prefix(
+                run_jobs[0].repo_address, run_jobs[0].job_id
+            )
+        else:
+            keys_prefix = run_prefix
+        job_ids = set(job.job_id for job in run_jobs)
+        for job_head_key in storage.list_objects(keys_prefix):
+            job_id = _get_job_head_key_prefix(job_head_key).split(";")[-2]
+            if job_id not in job_ids:
+                continue
+            if job_head_key == job_head_keys[job_id]:
+                unchanged_job_ids.add(job_id)
+            else:
+                stale_job_head_keys.append(job_head_key)
+    if stale_job_head_keys:
+        storage.delete_objects(stale_job_head_keys)
+    objects = {}
+    for job in jobs:
+        if job.job_id not in unchanged_job_ids:
+            objects[job_head_keys[job.job_id]] = ""
+        objects[_get_job_filename(job.repo_address, job.job_id)] = dump_object(job.serialize())
+    storage.put_objects(objects)
 
 
 def list_jobs(
@@ -50,18 +88,19 @@ def list_jobs(
 ) -> List[Job]:
     job_key_run_prefix = _get_jobs_filenames_prefix(repo_address, run_name)
     jobs_keys = storage.list_objects(job_key_run_prefix)
+    jobs_objs = storage.get_objects(jobs_keys)
     jobs = []
-    for job_key in jobs_keys:
-        job_obj = storage.get_object(job_key)
-        job = Job.unserialize(yaml.load(job_obj, yaml.FullLoader))
+    for job_obj in jobs_objs.values():
+        if job_obj is None:
+            continue
+        job = Job.unserialize(load_object(job_obj))
         jobs.append(job)
     return jobs
 
 
 def list_job_head(storage: Storage, repo_address: RepoAddress, job_id: str) -> Optional[JobHead]:
     job_head_key_prefix = _get_job_head_filename_prefix(repo_address, job_id)
-    job_head_keys = storage.list_objects(job_head_key_prefix)
-    for job_head_key in job_head_keys:
+    for job_head_key in storage.iter_objects(job_head_key_prefix):
         t = job_head_key[len(job_head_key_prefix) :].split(";")
         # Skip legacy format
         if len(t) == 7:
@@ -95,49 +134,56 @@ def list_job_heads(
     storage: Storage,
     repo_address: RepoAddress,
     run_name: Optional[str] = None,
+    limit: Optional[int] = None,
 ) -> List[JobHead]:
-    job_heads_keys_prefix = _get_job_heads_filenames_prefix(repo_address, run_name)
-    job_heads_keys = storage.list_objects(job_heads_keys_prefix)
     job_heads = []
-    for job_head_key in job_heads_keys:
-        t = job_head_key[len(_get_jobs_dir(repo_address)) :].split(";")
-        # Skip legacy format
-        if len(t) == 9:
-            (
-                _,
-                job_id,
-                provider_name,
-                local_repo_user_name,
-                submitted_at,
-                status,
-                artifacts,
-                app_names,
-                tag_name,
-            ) = tuple(t)
-            run_name, workflow_name, job_index = tuple(job_id.split(","))
-            job_heads.append(
-                JobHead(
-                    job_id=job_id,
-                    repo_address=repo_address,
-                    run_name=run_name,
-                    workflow_name=workflow_name or None,
-                    provider_name=provider_name,
-                    local_repo_user_name=local_repo_user_name,
-                    status=JobStatus(status),
-                    submitted_at=int(submitted_at),
-                    artifact_paths=artifacts.split(",") if artifacts else None,
-                    tag_name=tag_name or None,
-                    app_names=app_names.split(",") or None,
-                )
-            )
+    for job_head in iter_job_heads(storage, repo_address, run_name):
+        if limit is not None and len(job_heads) == limit:
+            break
+        job_heads.append(job_head)
     return job_heads
 
 
+def iter_job_heads(
+    storage: Storage,
+    repo_address: RepoAddress,
+    run_name: Optional[str] = None,
+) -> Generator[JobHead, None, None]:
+    job_heads_keys_prefix = _get_job_heads_filenames_prefix(repo_address, run_name)
+    for job_head_key in storage.iter_objects(job_heads_keys_prefix):
+        job_head = _parse_job_head_key(repo_address, job_head_key)
+        if job_head is not None:
+            yield job_head
+
+
 def delete_job_head(storage: Storage, repo_address: RepoAddress, job_id: str):
     job_head_key_prefix = _get_job_head_filename_prefix(repo_address, job_id)
     job_head_keys = storage.list_objects(job_head_key_prefix)
-    for job_head_key in job_head_keys:
-        storage.delete_object(job_head_key)
+    storage.delete_objects(job_head_keys)
+    job_heads = [_parse_job_head_key(repo_address, key) for key in job_head_keys]
+    manifests.remove_from_manifests(storage, [h for h in job_heads if h is not None])
+
+
+def delete_job_heads(
+    storage: Storage,
+    repo_address: RepoAddress,
+    run_name: Optional[str],
+) -> List[JobHead]:
+    job_heads_keys_prefix = _get_job_heads_filenames_prefix(repo_address, run_name)
+    job_heads_keys = []
+    job_heads = []
+    for job_head_key in storage.list_objects(job_heads_keys_prefix):
+        job_head = _parse_job_head_key(repo_address, job_head_key)
+        if job_head is None:
+            continue
+        if job_head.status.is_finished():
+            job_heads_keys.append(job_head_key)
+            job_heads.append(job_head)
+        elif run_name:
+            sys.exit("The run is not finished yet. Stop the run first.")
+    storage.delete_objects(job_heads_keys)
+    manifests.remove_from_manifests(storage, job_heads)
+    return job_heads
 
 
 def run_job(
@@ -163,6 +209,8 @@ def run_job(
         )
         runners.create_runner(storage, runner)
         runner.request_id = compute.run_instance(job, instance_type)
+        # Lets the caller roll back the instance if anything fails from here on
+        job.request_id = runner.request_id
         runners.update_runner(storage, runner)
     except Exception as e:
         job.status = JobStatus.FAILED
@@ -182,12 +230,93 @@ def stop_job(
     job_head = list_job_head(storage, repo_address, job_id)
     job = get_job(storage, repo_address, job_id)
     runner = runners.get_runner(storage, job.runner_id) if job else None
+    if runner and not runner.request_id and job.request_id:
+        # The runner wasn't updated with the request if the job failed right after it was made
+        runner.request_id = job.request_id
     request_status = (
-        compute.get_request_head(job, runner.request_id).status
+        compute.get_request_head(job, runner.request_id if runner else None).status
         if job
         else RequestStatus.TERMINATED
     )
-    if (
+    new_status = _get_stop_status(job_head, job, runner, request_status, abort)
+    if new_status:
+        if runner and runner.job.status.is_unfinished() and runner.job.status != new_status:
+            if new_status.is_finished():
+                runners.stop_runner(storage, compute, runner)
+            else:
+                runner.job.status = new_status
+                runners.update_runner(storage, runner)
+        if job and _is_stopped_job(job_head, job, new_status):
+            job.status = new_status
+            update_job(storage, job)
+
+
+def stop_jobs(
+    storage: Storage,
+    compute: Compute,
+    repo_address: RepoAddress,
+    run_name: Optional[str],
+    abort: bool,
+):
+    # Same as stop_job for every unfinished job of the run, but with the jobs, the runners and
+    # the requests loaded, and the instances stopped, in bulk
+    job_heads = [
+        h for h in list_job_heads(storage, repo_address, run_name) if h.status.is_unfinished()
+    ]
+    if not job_heads:
+        return
+    jobs = {
+        job.job_id: job for job in get_jobs(storage, repo_address, [h.job_id for h in job_heads])
+    }
+    runners_by_id = runners.get_runners(
+        storage, [job.runner_id for job in jobs.values() if job.runner_id]
+    )
+    jobs_and_runners = [
+        (job, runners_by_id.get(job.runner_id) if job.runner_id else None) for job in jobs.values()
+    ]
+    request_heads = compute.get_request_heads(
+        [(job, runner.request_id if runner else None) for job, runner in jobs_and_runners]
+    )
+    request_statuses = {
+        job.job_id: request_head.status
+        for (job, _), request_head in zip(jobs_and_runners, request_heads)
+    }
+    stopped_runners = []
+    updated_runners = []
+    updated_jobs = []
+    for job_head in job_heads:
+        job = jobs.get(job_head.job_id)
+        runner = runners_by_id.get(job.runner_id) if job and job.runner_id else None
+        request_status = request_statuses[job.job_id] if job else RequestStatus.TERMINATED
+        new_status = _get_stop_status(job_head, job, runner, request_status, abort)
+        if not new_status:
+            continue
+        if runner and runner.job.status.is_unfinished() and runner.job.status != new_status:
+            if new_status.is_finished():
+                stopped_runners.append(runner)
+            else:
+                runner.job.status = new_status
+                updated_runners.append(runner)
+        if job and _is_stopped_job(job_head, job, new_status):
+            job.status = new_status
+            updated_jobs.append(job)
+    if stopped_runners:
+        runners.stop_runners(storage, compute, stopped_runners)
+    for runner in updated_runners:
+        # Runners are written one by one to keep the stopping status in their metadata
+        runners.update_runner(storage, runner)
+    if updated_jobs:
+        update_jobs(storage, updated_jobs)
+
+
+def _get_stop_status(
+    job_head: Optional[JobHead],
+    job: Optional[Job],
+    runner: Optional[Runner],
+    request_status: RequestStatus,
+    abort: bool,
+) -> Optional[JobStatus]:
+    if not (
         job_head
         and job_head.status.is_unfinished()
         or job
@@ -196,43 +325,39 @@ def stop_job(
         and runner.job.status.is_unfinished()
         or request_status != RequestStatus.TERMINATED
     ):
-        if abort:
-            new_status = JobStatus.ABORTED
-        elif (
-            not job_head
-            or job_head.status in [JobStatus.SUBMITTED, JobStatus.DOWNLOADING]
-            or not job
-            or job.status in [JobStatus.SUBMITTED, JobStatus.DOWNLOADING]
-            or request_status == RequestStatus.TERMINATED
-            or not runner
-        ):
-            new_status = JobStatus.STOPPED
-        elif (
-            job_head
-            and job_head.status != JobStatus.UPLOADING
-            or job
-            and job.status != JobStatus.UPLOADING
-        ):
-            new_status = JobStatus.STOPPING
-        else:
-            new_status = None
-        if new_status:
-            if runner and runner.job.status.is_unfinished() and runner.job.status != new_status:
-                if new_status.is_finished():
-                    runners.stop_runner(storage, compute, runner)
-                else:
-                    runner.job.status = new_status
-                    runners.update_runner(storage, runner)
-            if (
-                job_head
-                and job_head.status.is_unfinished()
-                and job_head.status != new_status
-                or job
-                and job.status.is_unfinished()
-                and job.status != new_status
-            ):
-                job.status = new_status
-                update_job(storage, job)
+        return None
+    if abort:
+        return JobStatus.ABORTED
+    if (
+        not job_head
+        or job_head.status in [JobStatus.SUBMITTED, JobStatus.DOWNLOADING]
+        or not job
+        or job.status in [JobStatus.SUBMITTED, JobStatus.DOWNLOADING]
+        or request_status == RequestStatus.TERMINATED
+        or not runner
+    ):
+        return JobStatus.STOPPED
+    if (
+        job_head
+        and job_head.status != JobStatus.UPLOADING
+        or job
+        and job.status != JobStatus.UPLOADING
+    ):
+        return JobStatus.STOPPING
+    return None
+
+
+def _is_stopped_job(
+    job_head: Optional[JobHead], job: Optional[Job], new_status: JobStatus
+) -> bool:
+    return bool(
+        job_head
+        and job_head.status.is_unfinished()
+        and job_head.status != new_status
+        or job
+        and job.status.is_unfinished()
+        and job.status != new_status
+    )
 
 
 def _get_jobs_dir(repo_address: RepoAddress) -> str:
@@ -248,7 +373,7 @@ def _get_jobs_filenames_prefix(repo_address: RepoAddress, run_name: str) -> str:
 
 
 def _get_job_heads_filenames_prefix(repo_address: RepoAddress, run_name: Optional[str]) -> str:
-    return f"{_get_jobs_dir(repo_address)}l;{run_name or ''}"
+    return f"{_get_jobs_dir(repo_address)}l;{(run_name + ',') if run_name else ''}"
 
 
 def _get_job_head_filename_prefix(repo_address: RepoAddress, job_id: str) -> str:
@@ -271,3 +396,43 @@ def _get_job_head_filename(job: Job) -> str:
         f"{job.tag_name or ''}"
     )
     return key
+
+
+def _get_job_head(job: Job) -> JobHead:
+    return _parse_job_head_key(job.repo_address, _get_job_head_filename(job))
+
+
+def _get_job_head_key_prefix(job_head_key: str) -> str:
+    return ";".join(job_head_key.split(";")[:2]) + ";"
+
+
+def _parse_job_head_key(repo_address: RepoAddress, job_head_key: str) -> Optional[JobHead]:
+    t = job_head_key[len(_get_jobs_dir(repo_address)) :].split(";")
+    # Skip legacy format
+    if len(t) == 9:
+        (
+            _,
+            job_id,
+            provider_name,
+            local_repo_user_name,
+            submitted_at,
+            status,
+            artifacts,
+            app_names,
+            tag_name,
+        ) = tuple(t)
+        run_name, workflow_name, job_index = tuple(job_id.split(","))
+        return JobHead(
+            job_id=job_id,
+            repo_address=repo_address,
+            run_name=run_name,
+            workflow_name=workflow_name or None,
+            provider_name=provider_name,
+            local_repo_user_name=local_repo_user_name,
+            status=JobStatus(status),
+            submitted_at=int(submitted_at),
+            artifact_paths=artifacts.split(",") if artifacts else None,
+            tag_name=tag_name or None,
+            app_names=app_names.split(",") or None,
+        )
+    return None
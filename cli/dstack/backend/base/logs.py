@@ -1,12 +1,17 @@
+import heapq
 import json
 import re
-from typing import Any, Dict, Generator, List, Optional, Tuple
+import threading
+import time
+from collections import deque
+from queue import Empty, Queue
+from typing import Any, Dict, Generator, Iterable, List, Optional, Tuple
 from urllib import parse
 
 from dstack.backend.base import jobs, runs
 from dstack.backend.base.storage import Storage
 from dstack.core.app import AppSpec
-from dstack.core.job import JobHead
+from dstack.core.job import Job, JobHead
 from dstack.core.log_event import LogEvent, LogEventSource
 from dstack.core.repo import RepoAddress
 
@@ -16,14 +21,60 @@ CHECK_STATUS_EVERY_N = 3
 
 POLL_LOGS_RATE_SECS = 1
 
+MERGE_DELAY_SECS = 0.2
+
+MERGE_QUEUE_SIZE = 10000
+
+_SOURCE_DONE = object()
+
+
+class LogRewriter:
+    # Replaces local app URLs in the logs of a job with the URLs of its apps. Built once per job,
+    # so that the pattern and the URLs aren't rebuilt for every log message.
+    def __init__(
+        self,
+        host_name: Optional[str],
+        ports: Optional[List[int]],
+        app_specs: Optional[List[AppSpec]],
+    ):
+        self.host_name = host_name or "none"
+        self._pattern = re.compile(
+            f"http://(localhost|0.0.0.0|127.0.0.1|{self.host_name}):[\\S]*[^(.+)\\s\\n\\r]"
+        )
+        self._app_urls = []
+        if self.host_name != "none" and ports and app_specs:
+            for app_spec in app_specs:
+                port = ports[app_spec.port_index]
+                url_path = app_spec.url_path or ""
+                url_query_params = app_spec.url_query_params
+                url_query = ("?" + parse.urlencode(url_query_params)) if url_query_params else ""
+                app_url = f"http://{self.host_name}:{port}"
+                if url_path or url_query_params:
+                    app_url += "/"
+                    if url_query_params:
+                        app_url += url_query
+                self._app_urls.append(app_url)
+
+    @staticmethod
+    def from_job(job: Optional[Job]) -> "LogRewriter":
+        if job is None:
+            return LogRewriter(None, None, None)
+        return LogRewriter(job.host_name, job.ports, job.app_specs)
+
+    def rewrite(self, log: str) -> str:
+        # Most messages have no URLs at all, so the regex is only run on the ones that may
+        if not self._app_urls or "http://" not in log:
+            return log
+        for app_url in self._app_urls:
+            log = self._pattern.sub(app_url, log)
+        return log
+
 
 def render_log_message(
     storage: Storage,
     event: Dict[str, Any],
     repo_address: RepoAddress,
-    job_host_names: Dict[str, Optional[str]],
-    job_ports: Dict[str, Optional[List[int]]],
-    job_app_specs: Dict[str, Optional[List[AppSpec]]],
+    rewriters: Dict[str, LogRewriter],
 ) -> LogEvent:
     if isinstance(event, str):
         event = json.loads(event)
@@ -32,34 +83,92 @@ def render_log_message(
         message = json.loads(message)
     job_id = message["job_id"]
     log = message["log"]
-    if job_id and job_id not in job_host_names:
-        job = jobs.get_job(storage, repo_address, job_id)
-        job_host_names[job_id] = job.host_name or "none" if job else "none"
-        job_ports[job_id] = job.ports if job else None
-        job_app_specs[job_id] = job.app_specs if job else None
-    host_name = job_host_names[job_id]
-    ports = job_ports[job_id]
-    app_specs = job_app_specs[job_id]
-    pat = re.compile(f"http://(localhost|0.0.0.0|127.0.0.1|{host_name}):[\\S]*[^(.+)\\s\\n\\r]")
-    if re.search(pat, log):
-        if host_name != "none" and ports and app_specs:
-            for app_spec in app_specs:
-                port = ports[app_spec.port_index]
-                url_path = app_spec.url_path or ""
-                url_query_params = app_spec.url_query_params
-                url_query = ("?" + parse.urlencode(url_query_params)) if url_query_params else ""
-                app_url = f"http://{host_name}:{port}"
-                if url_path or url_query_params:
-                    app_url += "/"
-                    if url_query_params:
-                        app_url += url_query
-                log = re.sub(pat, app_url, log)
-    return LogEvent(
-        event_id=event["eventId"],
-        timestamp=event["timestamp"],
+    rewriter = rewriters.get(job_id)
+    if rewriter is None:
+        rewriter = LogRewriter.from_job(
+            jobs.get_job(storage, repo_address, job_id) if job_id else None
+        )
+        rewriters[job_id] = rewriter
+    log = rewriter.rewrite(log)
+    # Skips validation, which would otherwise take most of the time spent per message
+    return LogEvent.construct(
+        event_id=str(event["eventId"]),
+        timestamp=int(event["timestamp"]),
         job_id=job_id,
         log_message=log,
         log_source=LogEventSource.STDOUT
         if message["source"] == "stdout"
         else LogEventSource.STDERR,
     )
+
+
+def are_jobs_finished(
+    storage: Storage, repo_address: RepoAddress, job_heads: List[JobHead]
+) -> bool:
+    # The runner renames the job heads when the job statuses change, so listing the heads of
+    # the runs is enough and the jobs don't have to be loaded
+    job_ids = set(job_head.job_id for job_head in job_heads)
+    current_job_heads = [
+        job_head
+        for run_name in set(job_head.run_name for job_head in job_heads)
+        for job_head in jobs.list_job_heads(storage, repo_address, run_name)
+        if job_head.job_id in job_ids
+    ]
+    return all(job_head.status.is_finished() for job_head in current_job_heads)
+
+
+def merge_log_events(
+    sources: List[Iterable[LogEvent]], delay: float = MERGE_DELAY_SECS
+) -> Generator[LogEvent, None, None]:
+    # Reads the sources concurrently and yields their events ordered by timestamp. An event is
+    # held back until `delay` seconds after it arrived, so that events of slower sources that
+    # happened earlier can still be put before it.
+    if len(sources) == 1:
+        yield from sources[0]
+        return
+    queue = Queue(maxsize=MERGE_QUEUE_SIZE)
+    stopped = threading.Event()
+
+    def read_source(source: Iterable[LogEvent]):
+        try:
+            for event in source:
+                if stopped.is_set():
+                    return
+                queue.put(event)
+        except BaseException as e:
+            queue.put(e)
+        queue.put(_SOURCE_DONE)
+
+    for source in sources:
+        threading.Thread(target=read_source, args=(source,), daemon=True).start()
+    heap = []
+    pending = set()
+    deadlines = deque()
+    count = 0
+    sources_done = 0
+    try:
+        while sources_done < len(sources) or heap:
+            if sources_done < len(sources):
+                timeout = max(deadlines[0][0] - time.monotonic(), 0) if deadlines else None
+                try:
+                    item = queue.get(timeout=timeout)
+                except Empty:
+                    item = None
+                if item is _SOURCE_DONE:
+                    sources_done += 1
+                elif isinstance(item, BaseException):
+                    raise item
+                elif item is not None:
+                    heapq.heappush(heap, (item.timestamp, count, item))
+                    pending.add(count)
+                    deadlines.append((time.monotonic() + delay, count))
+                    count += 1
+            # Once the oldest event is due, everything before it in timestamp order goes too
+            while heap and (sources_done == len(sources) or deadlines[0][0] <= time.monotonic()):
+                _, i, event = heapq.heappop(heap)
+                pending.discard(i)
+                while deadlines and deadlines[0][1] not in pending:
+                    deadlines.popleft()
+                yield event
+    finally:
+        stopped.set()
@@ -0,0 +1,305 @@
+import threading
+import time
+from typing import Dict, Generator, List, Optional, Tuple
+
+from dstack.backend.base.serialization import dump_object, load_object
+from dstack.backend.base.storage import Storage
+from dstack.core.job import JobHead, JobStatus
+from dstack.core.repo import RepoAddress
+
+# A run manifest holds the heads of all jobs of a run, so that runs can be listed by reading
+# one object per run. Job head keys stay the source of truth: the runner updates them without
+# touching manifests, so unfinished runs are read from their job heads, and their manifests are
+# rewritten once they have finished, when the next run is submitted. Reads never write.
+
+# Runs are also indexed by submission time with keys that sort newest first:
+# t;<reversed month>;<reversed submitted_at>;<run_name>. Newest-first listings stop
+# within the latest partition, and a month can be listed on its own.
+
+# Unfinished runs are marked with u;<run_name> keys, so that they can be refreshed without
+# reading the manifests of all runs. The last successful run of every workflow is kept in
+# w;<workflow_name>, and is updated whenever a manifest with a newer done job is written.
+
+# Marks that every run of the repo has a manifest, a time index key, and is marked if unfinished.
+# It's written by `dstack migrate`, and until then runs are listed from job heads. The version is
+# bumped when the index gets new keys, so that older indexes are rebuilt.
+INDEXED_FILENAME = "_indexed_v2_"
+
+REVERSED_MONTH_BASE = 999999
+
+REVERSED_TIMESTAMP_BASE = 9999999999999
+
+# Serializes read-modify-write cycles of manifests within a process. Clients in different
+# processes aren't serialized, and the last writer wins: the jobs of a run are submitted by one
+# process, and a manifest that lost an update of another process is fixed by `dstack migrate`.
+_lock = threading.RLock()
+
+
+def get_manifests_by_run_names(
+    storage: Storage, repo_address: RepoAddress, run_names: List[str]
+) -> Dict[str, List[JobHead]]:
+    # Runs without manifests are omitted
+    keys = {run_name: _get_manifest_filename(repo_address, run_name) for run_name in run_names}
+    objs = storage.get_objects(list(keys.values()))
+    return {
+        run_name: _unserialize_manifest(repo_address, run_name, objs[key])
+        for run_name, key in keys.items()
+        if objs.get(key) is not None
+    }
+
+
+def is_indexed(storage: Storage, repo_address: RepoAddress) -> bool:
+    return storage.get_object(_get_indexed_filename(repo_address)) is not None
+
+
+def iter_time_index(
+    storage: Storage, repo_address: RepoAddress
+) -> Generator[Tuple[str, str], None, None]:
+    # Yields (run_name, key) pairs, newest first. Keys of runs deleted by older clients may be
+    # left behind, so callers skip runs without manifests.
+    for key in storage.iter_objects(_get_time_index_filenames_prefix(repo_address)):
+        yield key.split(";", 3)[3], key
+
+
+def list_manifest_run_names(
+    storage: Storage, repo_address: RepoAddress, run_name: Optional[str] = None
+) -> List[str]:
+    return _list_run_names(storage, _get_manifest_filename(repo_address, ""), run_name)
+
+
+def list_unfinished_run_names(
+    storage: Storage, repo_address: RepoAddress, run_name: Optional[str] = None
+) -> List[str]:
+    return _list_run_names(storage, _get_unfinished_filename(repo_address, ""), run_name)
+
+
+def _list_run_names(storage: Storage, keys_prefix: str, run_name: Optional[str]) -> List[str]:
+    # With run_name, only that run is listed. Keys of runs whose names start with it are skipped.
+    run_names = [
+        key[len(keys_prefix) :] for key in storage.iter_objects(keys_prefix + (run_name or ""))
+    ]
+    return [name for name in run_names if run_name is None or name == run_name]
+
+
+def get_last_done_run_name(
+    storage: Storage, repo_address: RepoAddress, workflow_name: str
+) -> Optional[str]:
+    # The run may have been deleted since
+    obj = storage.get_object(_get_last_done_filename(repo_address, workflow_name))
+    return load_object(obj)["run_name"] if obj is not None else None
+
+
+def put_last_done_run(
+    storage: Storage, repo_address: RepoAddress, workflow_name: str, job_head: Optional[JobHead]
+):
+    # Replaces the last successful run of the workflow, even with an older one
+    key = _get_last_done_filename(repo_address, workflow_name)
+    if job_head is None:
+        storage.delete_object(key)
+    else:
+        storage.put_object(key, _serialize_last_done_run(job_head))
+
+
+def put_manifests(
+    storage: Storage,
+    repo_address: RepoAddress,
+    job_heads_by_run: Dict[str, List[JobHead]],
+    indexed: bool = False,
+    time_indexed: bool = False,
+):
+    # Runs without job heads have their manifests deleted. With indexed, the manifests are of
+    # all runs of the repo, and the repo is marked as indexed. With time_indexed, the runs
+    # are new to the time index.
+    objects = {
+        _get_manifest_filename(repo_address, run_name): _serialize_manifest(run_name, job_heads)
+        for run_name, job_heads in job_heads_by_run.items()
+        if job_heads
+    }
+    for run_name, job_heads in job_heads_by_run.items():
+        if any(h.status.is_unfinished() for h in job_heads):
+            objects[_get_unfinished_filename(repo_address, run_name)] = ""
+    if indexed or time_indexed:
+        for run_name, job_heads in job_heads_by_run.items():
+            if job_heads:
+                submitted_at = min(h.submitted_at for h in job_heads)
+                objects[_get_time_index_filename(repo_address, run_name, submitted_at)] = ""
+    if indexed:
+        objects[_get_indexed_filename(repo_address)] = ""
+    if objects:
+        storage.put_objects(objects)
+    deleted_keys = []
+    for run_name, job_heads in job_heads_by_run.items():
+        if not job_heads:
+            deleted_keys.append(_get_manifest_filename(repo_address, run_name))
+        if not any(h.status.is_unfinished() for h in job_heads):
+            deleted_keys.append(_get_unfinished_filename(repo_address, run_name))
+    if deleted_keys:
+        storage.delete_objects(deleted_keys)
+    _update_last_done_runs(
+        storage, repo_address, [h for job_heads in job_heads_by_run.values() for h in job_heads]
+    )
+
+
+def update_manifests(storage: Storage, job_heads: List[JobHead], create: bool = False):
+    # Adds or replaces the job heads in the manifests of their runs. Missing manifests are
+    # created only for new runs; manifests of older runs are built by `dstack migrate`.
+    _change_manifests(storage, job_heads, create, remove=False)
+
+
+def remove_from_manifests(storage: Storage, job_heads: List[JobHead]):
+    _change_manifests(storage, job_heads, create=False, remove=True)
+
+
+def _change_manifests(storage: Storage, job_heads: List[JobHead], create: bool, remove: bool):
+    if not job_heads:
+        return
+    repo_address = job_heads[0].repo_address
+    job_heads_by_run = {}
+    for job_head in job_heads:
+        job_heads_by_run.setdefault(job_head.run_name, []).append(job_head)
+    # Serializes read-modify-write cycles of jobs that are submitted concurrently
+    with _lock:
+        objs = storage.get_objects(
+            [_get_manifest_filename(repo_address, run_name) for run_name in job_heads_by_run]
+        )
+        changed_job_heads_by_run = {}
+        new_time_index_keys = []
+        stale_time_index_keys = []
+        for obj, (run_name, run_job_heads) in zip(objs.values(), job_heads_by_run.items()):
+            if obj is None:
+                if not create:
+                    continue
+                submitted_at = min(h.submitted_at for h in run_job_heads)
+                new_time_index_keys.append(
+                    _get_time_index_filename(repo_address, run_name, submitted_at)
+                )
+            manifest_job_heads = {
+                h.job_id: h
+                for h in (
+                    _unserialize_manifest(repo_address, run_name, obj) if obj is not None else []
+                )
+            }
+            for job_head in run_job_heads:
+                if remove:
+                    manifest_job_heads.pop(job_head.job_id, None)
+                else:
+                    manifest_job_heads[job_head.job_id] = job_head
+            changed_job_heads_by_run[run_name] = [
+                manifest_job_heads[job_id] for job_id in sorted(manifest_job_heads)
+            ]
+            if obj is not None and not manifest_job_heads:
+                # The run was deleted
+                submitted_at = min(
+                    h.submitted_at for h in _unserialize_manifest(repo_address, run_name, obj)
+                )
+                stale_time_index_keys.append(
+                    _get_time_index_filename(repo_address, run_name, submitted_at)
+                )
+        put_manifests(storage, repo_address, changed_job_heads_by_run)
+        if new_time_index_keys:
+            storage.put_objects({key: "" for key in new_time_index_keys})
+        if stale_time_index_keys:
+            storage.delete_objects(stale_time_index_keys)
+
+
+def _update_last_done_runs(storage: Storage, repo_address: RepoAddress, job_heads: List[JobHead]):
+    last_done_job_heads = {}
+    for job_head in job_heads:
+        if job_head.status != JobStatus.DONE or not job_head.workflow_name:
+            continue
+        last_done_job_head = last_done_job_heads.get(job_head.workflow_name)
+        if last_done_job_head is None or job_head.submitted_at > last_done_job_head.submitted_at:
+            last_done_job_heads[job_head.workflow_name] = job_head
+    if not last_done_job_heads:
+        return
+    keys = {
+        _get_last_done_filename(repo_address, workflow_name): job_head
+        for workflow_name, job_head in last_done_job_heads.items()
+    }
+    # Serializes read-compare-write cycles of concurrent refreshes
+    with _lock:
+        objects = {}
+        for key, obj in storage.get_objects(list(keys)).items():
+            if obj is None or keys[key].submitted_at > load_object(obj)["submitted_at"]:
+                objects[key] = _serialize_last_done_run(keys[key])
+        if objects:
+            storage.put_objects(objects)
+
+
+def _serialize_last_done_run(job_head: JobHead) -> str:
+    return dump_object({"run_name": job_head.run_name, "submitted_at": job_head.submitted_at})
+
+
+def _serialize_manifest(run_name: str, job_heads: List[JobHead]) -> str:
+    return dump_object(
+        {
+            "run_name": run_name,
+            "job_heads": [
+                {
+                    "job_id": h.job_id,
+                    "workflow_name": h.workflow_name,
+                    "provider_name": h.provider_name,
+                    "local_repo_user_name": h.local_repo_user_name,
+                    "status": h.status.value,
+                    "submitted_at": h.submitted_at,
+                    "artifact_paths": h.artifact_paths,
+                    "tag_name": h.tag_name,
+                    "app_names": h.app_names,
+                }
+                for h in job_heads
+            ],
+        }
+    )
+
+
+def _unserialize_manifest(repo_address: RepoAddress, run_name: str, obj: str) -> List[JobHead]:
+    return [
+        JobHead(
+            job_id=h["job_id"],
+            repo_address=repo_address,
+            run_name=run_name,
+            workflow_name=h.get("workflow_name"),
+            provider_name=h["provider_name"],
+            local_repo_user_name=h.get("local_repo_user_name"),
+            status=JobStatus(h["status"]),
+            submitted_at=h["submitted_at"],
+            artifact_paths=h.get("artifact_paths"),
+            tag_name=h.get("tag_name"),
+            app_names=h.get("app_names"),
+        )
+        for h in load_object(obj)["job_heads"]
+    ]
+
+
+def _get_manifests_dir(repo_address: RepoAddress) -> str:
+    return f"runs/{repo_address.path()}/"
+
+
+def _get_manifest_filename(repo_address: RepoAddress, run_name: str) -> str:
+    return f"{_get_manifests_dir(repo_address)}l;{run_name}"
+
+
+def _get_unfinished_filename(repo_address: RepoAddress, run_name: str) -> str:
+    return f"{_get_manifests_dir(repo_address)}u;{run_name}"
+
+
+def _get_last_done_filename(repo_address: RepoAddress, workflow_name: str) -> str:
+    return f"{_get_manifests_dir(repo_address)}w;{workflow_name}"
+
+
+def _get_indexed_filename(repo_address: RepoAddress) -> str:
+    return f"{_get_manifests_dir(repo_address)}{INDEXED_FILENAME}"
+
+
+def _get_time_index_filenames_prefix(repo_address: RepoAddress) -> str:
+    return f"{_get_manifests_dir(repo_address)}t;"
+
+
+def _get_time_index_filename(repo_address: RepoAddress, run_name: str, submitted_at: int) -> str:
+    month = int(time.strftime("%Y%m", time.gmtime(submitted_at / 1000)))
+    return (
+        f"{_get_time_index_filenames_prefix(repo_address)}"
+        f"{REVERSED_MONTH_BASE - month:06d};"
+        f"{REVERSED_TIMESTAMP_BASE - submitted_at:013d};"
+        f"{run_name}"
+    )
@@ -9,10 +9,9 @@ from dstack.core.secret import Secret
 
 def get_repo_head(storage: Storage, repo_address: RepoAddress) -> Optional[RepoHead]:
     repo_head_prefix = _get_repo_head_filename_prefix(repo_address)
-    repo_heads_keys = storage.list_objects(repo_head_prefix)
-    if len(repo_heads_keys) == 0:
+    repo_head_key = next(storage.iter_objects(repo_head_prefix, limit=1), None)
+    if repo_head_key is None:
         return None
-    repo_head_key = repo_heads_keys[0]
     last_run_at, tags_count = repo_head_key[len(repo_head_prefix) :].split(";")
     return RepoHead(
         repo_host_name=repo_address.repo_host_name,
@@ -24,11 +23,12 @@ def get_repo_head(storage: Storage, repo_address: RepoAddress) -> Optional[RepoH
     )
 
 
-def list_repo_heads(storage: Storage) -> List[RepoHead]:
+def list_repo_heads(storage: Storage, limit: Optional[int] = None) -> List[RepoHead]:
     repo_heads_prefix = _get_repo_heads_prefix()
-    repo_heads_keys = storage.list_objects(repo_heads_prefix)
     repo_heads = []
-    for repo_head_key in repo_heads_keys:
+    for repo_head_key in storage.iter_objects(repo_heads_prefix):
+        if limit is not None and len(repo_heads) == limit:
+            break
         tokens = repo_head_key[len(repo_heads_prefix) :].split(";")
         # Skipt legacy repo heads
         if len(tokens) == 5:
@@ -123,8 +123,7 @@ def _create_or_update_repo_head(storage: Storage, repo_head: RepoHead):
 def _delete_repo_head(storage: Storage, repo_address: RepoAddress):
     repo_head_prefix = _get_repo_head_filename_prefix(repo_address)
     repo_heads_keys = storage.list_objects(repo_head_prefix)
-    for repo_head_key in repo_heads_keys:
-        storage.delete_object(repo_head_key)
+    storage.delete_objects(repo_heads_keys)
 
 
 def _get_repo_heads_prefix() -> str:
@@ -1,8 +1,7 @@
-from typing import Optional
-
-import yaml
+from typing import Dict, List, Optional
 
 from dstack.backend.base.compute import Compute
+from dstack.backend.base.serialization import dump_object, load_object
 from dstack.backend.base.storage import Storage
 from dstack.core.job import JobStatus
 from dstack.core.runners import Runner
@@ -12,7 +11,16 @@ def get_runner(storage: Storage, runner_id: str) -> Optional[Runner]:
     obj = storage.get_object(_get_runner_filename(runner_id))
     if obj is None:
         return None
-    return Runner.unserialize(yaml.load(obj, yaml.FullLoader))
+    return Runner.unserialize(load_object(obj))
+
+
+def get_runners(storage: Storage, runner_ids: List[str]) -> Dict[str, Optional[Runner]]:
+    objs = storage.get_objects(list(set(_get_runner_filename(r) for r in runner_ids)))
+    runners = {}
+    for runner_id in runner_ids:
+        obj = objs[_get_runner_filename(runner_id)]
+        runners[runner_id] = Runner.unserialize(load_object(obj)) if obj is not None else None
+    return runners
 
 
 def create_runner(storage: Storage, runner: Runner):
@@ -21,7 +29,7 @@ def create_runner(storage: Storage, runner: Runner):
         metadata["status"] = "stopping"
     storage.put_object(
         key=_get_runner_filename(runner.runner_id),
-        content=yaml.dump(runner.serialize()),
+        content=dump_object(runner.serialize()),
         metadata=metadata,
     )
 
@@ -43,5 +51,18 @@ def stop_runner(storage: Storage, compute: Compute, runner: Runner):
     delete_runner(storage, runner)
 
 
+def stop_runners(storage: Storage, compute: Compute, runners: List[Runner]):
+    instance_request_ids = []
+    spot_request_ids = []
+    for runner in runners:
+        if runner.request_id:
+            if runner.resources.interruptible:
+                spot_request_ids.append(runner.request_id)
+            else:
+                instance_request_ids.append(runner.request_id)
+    compute.stop_requests(instance_request_ids, spot_request_ids)
+    storage.delete_objects([_get_runner_filename(runner.runner_id) for runner in runners])
+
+
 def _get_runner_filename(runner_id: str) -> str:
     return f"runners/{runner_id}.yaml"
@@ -1,13 +1,12 @@
-from typing import List
+from typing import Dict, Generator, List, Optional, Tuple
 
-import yaml
-
-from dstack.backend.base import BackendType, jobs, runners
+from dstack.backend.base import BackendType, jobs, manifests, runners
 from dstack.backend.base.compute import Compute
+from dstack.backend.base.serialization import dump_object, load_object
 from dstack.backend.base.storage import Storage
 from dstack.core.app import AppHead
 from dstack.core.artifact import ArtifactHead
-from dstack.core.job import JobHead
+from dstack.core.job import JobHead, JobStatus
 from dstack.core.repo import RepoAddress
 from dstack.core.run import (
     RequestHead,
@@ -16,6 +15,8 @@ from dstack.core.run import (
     generate_remote_run_name_prefix,
 )
 
+RECENT_RUNS_BATCH_SIZE = 16
+
 
 def create_run(
     storage: Storage,
@@ -28,19 +29,188 @@ def create_run(
         name = generate_remote_run_name_prefix()
     run_name_index = _next_run_name_index(storage, name)
     run_name = f"{name}-{run_name_index}"
+    _settle_manifests(storage, repo_address)
     return run_name
 
 
 def _next_run_name_index(storage: Storage, run_name: str) -> int:
-    count = 0
+    # The counter is only a hint. An index is taken by creating its claim object, which fails
+    # if another client has claimed it first, so concurrent clients never get the same index.
     key = f"run-names/{run_name}.yaml"
     obj = storage.get_object(key)
-    if obj is None:
-        storage.put_object(key=key, content=yaml.dump({"count": 1}))
-        return 1
-    count = yaml.load(obj, yaml.FullLoader)["count"]
-    storage.put_object(key=key, content=yaml.dump({"count": count + 1}))
-    return count + 1
+    count = load_object(obj)["count"] if obj is not None else 0
+    index = count + 1
+    try:
+        while not storage.put_object_if_absent(f"run-names/{run_name}/{index}", ""):
+            index += 1
+    except NotImplementedError:
+        # Without atomic creates, concurrent clients may get the same index
+        pass
+    storage.put_object(key=key, content=dump_object({"count": index}))
+    return index
+
+
+def delete_run_name_claims(storage: Storage, run_names: List[str]):
+    # Indexes below the counter are never claimed again, so their claims are deleted with the
+    # runs. The claim at the counter is kept, as new clients start right after it.
+    indexes_by_prefix = {}
+    for run_name in run_names:
+        prefix, _, index = run_name.rpartition("-")
+        if prefix and index.isdigit():
+            indexes_by_prefix.setdefault(prefix, []).append(int(index))
+    counters = storage.get_objects([f"run-names/{prefix}.yaml" for prefix in indexes_by_prefix])
+    claim_keys = []
+    for prefix, indexes in indexes_by_prefix.items():
+        obj = counters.get(f"run-names/{prefix}.yaml")
+        if obj is None:
+            continue
+        count = load_object(obj)["count"]
+        claim_keys.extend(f"run-names/{prefix}/{index}" for index in indexes if index < count)
+    storage.delete_objects(claim_keys)
+
+
+def list_run_heads(
+    storage: Storage,
+    compute: Compute,
+    repo_address: RepoAddress,
+    run_name: Optional[str] = None,
+    include_request_heads: bool = True,
+) -> List[RunHead]:
+    # Reads one manifest per run, once the repo is indexed by `dstack migrate`. Nothing is
+    # written, so listing runs costs reads only.
+    if run_name is not None:
+        job_heads = _get_fresh_manifests(storage, repo_address, [run_name]).get(run_name)
+        if job_heads is None:
+            # Runs submitted by clients that don't write manifests
+            job_heads = jobs.list_job_heads(storage, repo_address, run_name)
+    elif manifests.is_indexed(storage, repo_address):
+        job_heads_by_run = _get_fresh_manifests(
+            storage, repo_address, manifests.list_manifest_run_names(storage, repo_address)
+        )
+        job_heads = [h for run_job_heads in job_heads_by_run.values() for h in run_job_heads]
+    else:
+        job_heads = jobs.list_job_heads(storage, repo_address)
+    return get_run_heads(storage, compute, job_heads, include_request_heads)
+
+
+def iter_recent_job_heads(
+    storage: Storage, repo_address: RepoAddress
+) -> Generator[JobHead, None, None]:
+    # Newest runs first. Reads manifests in batches, so that finding a recent run touches
+    # only the latest time index partition and a few manifests.
+    if not manifests.is_indexed(storage, repo_address):
+        yield from sorted(
+            jobs.list_job_heads(storage, repo_address), key=lambda h: h.submitted_at, reverse=True
+        )
+        return
+    run_names = set()
+    batch = []
+    for run_name, _ in manifests.iter_time_index(storage, repo_address):
+        if run_name in run_names:
+            continue
+        run_names.add(run_name)
+        batch.append(run_name)
+        if len(batch) == RECENT_RUNS_BATCH_SIZE:
+            yield from _get_recent_job_heads(storage, repo_address, batch)
+            batch = []
+    yield from _get_recent_job_heads(storage, repo_address, batch)
+
+
+def get_last_done_run_name(
+    storage: Storage, repo_address: RepoAddress, workflow_name: str
+) -> Optional[str]:
+    if not manifests.is_indexed(storage, repo_address):
+        return _find_last_done_run_name(storage, repo_address, workflow_name)
+    # Runs that succeeded since their manifests were written are among the unfinished ones
+    run_names = manifests.list_unfinished_run_names(storage, repo_address)
+    last_done_run_name = manifests.get_last_done_run_name(storage, repo_address, workflow_name)
+    if last_done_run_name is not None and last_done_run_name not in run_names:
+        run_names.append(last_done_run_name)
+    job_heads_by_run = _get_fresh_manifests(storage, repo_address, run_names)
+    if last_done_run_name is not None and last_done_run_name not in job_heads_by_run:
+        # The run was deleted
+        return _find_last_done_run_name(storage, repo_address, workflow_name)
+    last_done_job_head = None
+    for run_job_heads in job_heads_by_run.values():
+        for job_head in run_job_heads:
+            if (
+                job_head.workflow_name == workflow_name
+                and job_head.status == JobStatus.DONE
+                and (
+                    last_done_job_head is None
+                    or job_head.submitted_at > last_done_job_head.submitted_at
+                )
+            ):
+                last_done_job_head = job_head
+    return last_done_job_head.run_name if last_done_job_head else None
+
+
+def _find_last_done_run_name(
+    storage: Storage, repo_address: RepoAddress, workflow_name: str
+) -> Optional[str]:
+    return next(
+        (
+            h.run_name
+            for h in iter_recent_job_heads(storage, repo_address)
+            if h.workflow_name == workflow_name and h.status == JobStatus.DONE
+        ),
+        None,
+    )
+
+
+def reindex_runs(storage: Storage, repo_address: RepoAddress) -> int:
+    # Rebuilds run manifests and the time index from job heads
+    stale_keys = [key for _, key in manifests.iter_time_index(storage, repo_address)]
+    storage.delete_objects(stale_keys)
+    job_heads_by_run = {}
+    for job_head in jobs.list_job_heads(storage, repo_address):
+        job_heads_by_run.setdefault(job_head.run_name, []).append(job_head)
+    manifests.put_manifests(storage, repo_address, job_heads_by_run, indexed=True)
+    return len(job_heads_by_run)
+
+
+def _settle_manifests(storage: Storage, repo_address: RepoAddress):
+    # The runner updates job heads but not manifests, so the manifests of runs that finished
+    # since they were written are rewritten here, when a run is submitted, rather than by
+    # the commands that only read them
+    if not manifests.is_indexed(storage, repo_address):
+        return
+    run_names = manifests.list_unfinished_run_names(storage, repo_address)
+    job_heads_by_run = manifests.get_manifests_by_run_names(storage, repo_address, run_names)
+    changed_job_heads_by_run = {}
+    for run_name in run_names:
+        job_heads = jobs.list_job_heads(storage, repo_address, run_name)
+        # Manifests are sorted by job id, and listings by key, which differ at 11+ jobs
+        if {h.job_id: h for h in job_heads} != {
+            h.job_id: h for h in job_heads_by_run.get(run_name, [])
+        }:
+            changed_job_heads_by_run[run_name] = job_heads
+    if changed_job_heads_by_run:
+        manifests.put_manifests(storage, repo_address, changed_job_heads_by_run)
+
+
+def _get_fresh_manifests(
+    storage: Storage, repo_address: RepoAddress, run_names: List[str]
+) -> Dict[str, List[JobHead]]:
+    # Runs without manifests or job heads are omitted. The runner updates job heads but not
+    # manifests, so the job heads of unfinished runs are listed instead of their manifests.
+    job_heads_by_run = manifests.get_manifests_by_run_names(storage, repo_address, run_names)
+    for run_name, job_heads in list(job_heads_by_run.items()):
+        if any(h.status.is_unfinished() for h in job_heads):
+            job_heads = jobs.list_job_heads(storage, repo_address, run_name)
+            if job_heads:
+                job_heads_by_run[run_name] = job_heads
+            else:
+                del job_heads_by_run[run_name]
+    return job_heads_by_run
+
+
+def _get_recent_job_heads(
+    storage: Storage, repo_address: RepoAddress, run_names: List[str]
+) -> List[JobHead]:
+    # Time index keys of deleted runs are skipped, and removed by `dstack migrate`
+    job_heads_by_run = _get_fresh_manifests(storage, repo_address, run_names)
+    return [h for run_name in run_names for h in job_heads_by_run.get(run_name, [])]
 
 
 def get_run_heads(
@@ -50,22 +220,62 @@ def get_run_heads(
     include_request_heads: bool,
 ) -> List[RunHead]:
     runs_by_id = {}
+    unfinished_job_heads = []
     for job_head in job_heads:
         run_id = ",".join([job_head.run_name, job_head.workflow_name or ""])
         if run_id not in runs_by_id:
-            runs_by_id[run_id] = _create_run(storage, compute, job_head, include_request_heads)
+            runs_by_id[run_id] = _create_run(job_head)
         else:
-            run = runs_by_id[run_id]
-            _update_run(storage, compute, run, job_head, include_request_heads)
+            _update_run(runs_by_id[run_id], job_head)
+        if include_request_heads and job_head.status.is_unfinished():
+            unfinished_job_heads.append((runs_by_id[run_id], job_head))
+    if unfinished_job_heads:
+        _add_request_heads(storage, compute, unfinished_job_heads)
     return sorted(list(runs_by_id.values()), key=lambda r: r.submitted_at, reverse=True)
 
 
-def _create_run(
+def _add_request_heads(
     storage: Storage,
     compute: Compute,
-    job_head: JobHead,
-    include_request_heads: bool,
-) -> RunHead:
+    runs_and_job_heads: List[Tuple[RunHead, JobHead]],
+):
+    # Resolves request heads of all unfinished jobs at once instead of job by job
+    repo_addresses = {}
+    job_ids_by_repo = {}
+    for _, job_head in runs_and_job_heads:
+        repo_addresses[job_head.repo_address.path()] = job_head.repo_address
+        job_ids_by_repo.setdefault(job_head.repo_address.path(), []).append(job_head.job_id)
+    jobs_by_id = {}
+    for repo_path, job_ids in job_ids_by_repo.items():
+        for job in jobs.get_jobs(storage, repo_addresses[repo_path], job_ids):
+            jobs_by_id[job.job_id] = job
+    runners_by_id = runners.get_runners(
+        storage,
+        [
+            job.runner_id
+            for job in jobs_by_id.values()
+            if job.request_id is None and job.runner_id is not None
+        ],
+    )
+    runs = []
+    jobs_and_request_ids = []
+    for run, job_head in runs_and_job_heads:
+        if run.request_heads is None:
+            run.request_heads = []
+        job = jobs_by_id.get(job_head.job_id)
+        if job is None:
+            continue
+        request_id = job.request_id
+        if request_id is None and job.runner_id is not None:
+            runner = runners_by_id[job.runner_id]
+            request_id = runner.request_id if runner is not None else None
+        runs.append(run)
+        jobs_and_request_ids.append((job, request_id))
+    for run, request_head in zip(runs, compute.get_request_heads(jobs_and_request_ids)):
+        run.request_heads.append(request_head)
+
+
+def _create_run(job_head: JobHead) -> RunHead:
     app_heads = (
         list(
             map(
@@ -88,17 +298,6 @@ def _create_run(
         if job_head.artifact_paths
         else None
     )
-    request_heads = None
-    if include_request_heads and job_head.status.is_unfinished():
-        if request_heads is None:
-            request_heads = []
-        job = jobs.get_job(storage, job_head.repo_address, job_head.job_id)
-        request_id = job.request_id
-        if request_id is None and job.runner_id is not None:
-            runner = runners.get_runner(storage, job.runner_id)
-            request_id = runner.request_id
-        request_head = compute.get_request_head(job, request_id)
-        request_heads.append(request_head)
     run_head = RunHead(
         repo_address=job_head.repo_address,
         run_name=job_head.run_name,
@@ -110,18 +309,12 @@ def _create_run(
         submitted_at=job_head.submitted_at,
         tag_name=job_head.tag_name,
         app_heads=app_heads,
-        request_heads=request_heads,
+        request_heads=None,
     )
     return run_head
 
 
-def _update_run(
-    storage: Storage,
-    compute: Compute,
-    run: RunHead,
-    job_head: JobHead,
-    include_request_heads: bool,
-):
+def _update_run(run: RunHead, job_head: JobHead):
     run.submitted_at = min(run.submitted_at, job_head.submitted_at)
     if job_head.artifact_paths:
         if run.artifact_heads is None:
@@ -149,13 +342,3 @@ def _update_run(
         )
     if job_head.status.is_unfinished():
         run.status = job_head.status
-        if include_request_heads:
-            if run.request_heads is None:
-                run.request_heads = []
-            job = jobs.get_job(storage, job_head.repo_address, job_head.job_id)
-            request_id = job.request_id
-            if request_id is None and job.runner_id is not None:
-                runner = runners.get_runner(storage, job.runner_id)
-                request_id = runner.request_id
-            request_head = compute.get_request_head(job, request_id)
-            run.request_heads.append(request_head)
@@ -0,0 +1,36 @@
+import json
+from typing import Any, Dict
+
+import yaml
+
+from dstack.core.error import BackendError
+
+_YAML_LOADER = getattr(yaml, "CFullLoader", yaml.FullLoader)
+
+# Objects are written with a header that names their format. It is a YAML comment, so the runner
+# can still read them as YAML.
+FORMAT_HEADER = "#dstack:"
+
+FORMAT_VERSION = 1
+
+
+def dump_object(data: Dict[str, Any]) -> str:
+    # Version 1: compact JSON, which is also valid YAML
+    return f"{FORMAT_HEADER}{FORMAT_VERSION}\n" + json.dumps(
+        data, separators=(",", ":"), ensure_ascii=False
+    )
+
+
+def load_object(content: str) -> Dict[str, Any]:
+    if content.startswith(FORMAT_HEADER):
+        header, _, content = content.partition("\n")
+        version = header[len(FORMAT_HEADER) :]
+        if version != str(FORMAT_VERSION):
+            raise BackendError(
+                f"The object has format version {version}. Upgrade dstack to read it."
+            )
+        return json.loads(content)
+    # Objects without a header were written by older versions, as YAML or JSON, or by the runner
+    if content.lstrip().startswith("{"):
+        return json.loads(content)
+    return yaml.load(content, _YAML_LOADER)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Dict, Generator, List, Optional, Tuple
 
 
 class Storage(ABC):
@@ -12,9 +12,42 @@ class Storage(ABC):
         pass
 
     @abstractmethod
-    def delete_object(self, key: str):
+    def put_object_if_absent(self, key: str, content: str) -> bool:
+        # Atomically creates the object. Returns False if it already exists. Raises
+        # NotImplementedError if the storage can't create objects atomically.
         pass
 
+    def get_object_if_modified(
+        self, key: str, etag: Optional[str]
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        # Returns (modified, content, etag). Storages that can't revalidate always report
+        # the object as modified.
+        return True, self.get_object(key), None
+
     @abstractmethod
+    def delete_object(self, key: str):
+        pass
+
     def list_objects(self, keys_prefix: str) -> List[str]:
+        return list(self.iter_objects(keys_prefix))
+
+    @abstractmethod
+    def iter_objects(
+        self,
+        keys_prefix: str,
+        start_after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Generator[str, None, None]:
+        pass
+
+    @abstractmethod
+    def put_objects(self, objects: Dict[str, str]):
+        pass
+
+    @abstractmethod
+    def get_objects(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        pass
+
+    @abstractmethod
+    def delete_objects(self, keys: List[str]):
         pass
@@ -12,10 +12,10 @@ from dstack.core.tag import TagHead
 
 def get_tag_head(storage: Storage, repo_address: RepoAddress, tag_name: str) -> Optional[TagHead]:
     tag_head_key_prefix = _get_tag_head_filename_prefix(repo_address, tag_name)
-    tag_head_keys = storage.list_objects(keys_prefix=tag_head_key_prefix)
-    if len(tag_head_keys) == 0:
+    tag_head_key = next(storage.iter_objects(tag_head_key_prefix, limit=1), None)
+    if tag_head_key is None:
         return None
-    t = tag_head_keys[0][len(tag_head_key_prefix) :].split(";")
+    t = tag_head_key[len(tag_head_key_prefix) :].split(";")
     if len(t) == 6:
         (
             run_name,
@@ -37,11 +37,12 @@ def get_tag_head(storage: Storage, repo_address: RepoAddress, tag_name: str) ->
         )
 
 
-def list_tag_heads(storage: Storage, repo_address: RepoAddress):
+def list_tag_heads(storage: Storage, repo_address: RepoAddress, limit: Optional[int] = None):
     tag_heads_keys_prefix = _get_tag_heads_filenames_prefix(repo_address)
-    tag_heads_keys = storage.list_objects(tag_heads_keys_prefix)
     tag_heads = []
-    for tag_head_key in tag_heads_keys:
+    for tag_head_key in storage.iter_objects(tag_heads_keys_prefix):
+        if limit is not None and len(tag_heads) == limit:
+            break
         t = tag_head_key[len(tag_heads_keys_prefix) :].split(";")
         if len(t) == 7:
             (
@@ -73,16 +74,12 @@ def delete_tag(
     repo_address: RepoAddress,
     tag_head: TagHead,
 ):
-    tag_jobs = []
     job_heads = jobs.list_job_heads(storage, repo_address, tag_head.run_name)
-    for job_head in job_heads:
-        job = jobs.get_job(storage, repo_address, job_head.job_id)
-        if job is not None:
-            tag_jobs.append(job)
+    tag_jobs = jobs.get_jobs(storage, repo_address, [job_head.job_id for job_head in job_heads])
     storage.delete_object(_get_tag_head_key(tag_head))
     for job in tag_jobs:
         job.tag_name = None
-        jobs.update_job(storage, job)
+    jobs.update_jobs(storage, tag_jobs)
 
 
 def create_tag_from_run(
@@ -95,15 +92,14 @@ def create_tag_from_run(
     if run_jobs:
         tag_jobs = run_jobs
     else:
-        tag_jobs = []
         job_with_anther_tag = None
         job_heads = jobs.list_job_heads(storage, repo_address, run_name)
-        for job_head in job_heads:
-            job = jobs.get_job(storage, repo_address, job_head.job_id)
-            if job:
-                tag_jobs.append(job)
-                if job.tag_name and job.tag_name != tag_name:
-                    job_with_anther_tag = job
+        tag_jobs = jobs.get_jobs(
+            storage, repo_address, [job_head.job_id for job_head in job_heads]
+        )
+        for job in tag_jobs:
+            if job.tag_name and job.tag_name != tag_name:
+                job_with_anther_tag = job
         if job_with_anther_tag:
             raise BackendError(
                 f"The run '{job_with_anther_tag.run_name}' refers to another tag: "
@@ -132,7 +128,7 @@ def create_tag_from_run(
     if not run_jobs:
         for job in tag_jobs:
             job.tag_name = tag_name
-            jobs.update_job(storage, job)
+        jobs.update_jobs(storage, tag_jobs)
 
 
 def _get_tags_dir(repo_address: RepoAddress) -> str:
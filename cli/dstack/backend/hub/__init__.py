@@ -1,4 +1,5 @@
 import sys
+import threading
 from abc import ABC
 from pathlib import Path
 from typing import Dict, Generator, List, Optional, Tuple
@@ -95,9 +96,17 @@ class HubBackend(RemoteBackend):
         job_heads: List[JobHead],
         start_time: int,
         attached: bool,
+        stopped: Optional[threading.Event] = None,
     ) -> Generator[LogEvent, None, None]:
-        # /{hub_name}/logs/poll
-        pass
+        for event in self._hub_client().poll_logs(
+            repo_address=repo_address,
+            job_heads=job_heads,
+            start_time=start_time,
+            attached=attached,
+        ):
+            if stopped is not None and stopped.is_set():
+                return
+            yield event
 
     def list_run_artifact_files(
         self, repo_address: RepoAddress, run_name: str
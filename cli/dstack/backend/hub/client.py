@@ -1,4 +1,5 @@
-from typing import Dict, List, Optional
+from collections import Counter
+from typing import Dict, Generator, List, Optional
 from urllib.parse import urlunparse
 
 import requests
@@ -10,7 +11,15 @@ from dstack.core.repo import LocalRepoData, RepoAddress, RepoCredentials, RepoHe
 from dstack.core.run import RunHead
 from dstack.core.secret import Secret
 from dstack.core.tag import TagHead
-from dstack.hub.models import AddTagPath, AddTagRun, JobsGet, ReposUpdate, RunsList, StopRunners
+from dstack.hub.models import (
+    AddTagPath,
+    AddTagRun,
+    JobsGet,
+    PollLogs,
+    ReposUpdate,
+    RunsList,
+    StopRunners,
+)
 
 
 def _url(scheme="", host="", path="", params="", query="", fragment=""):
@@ -180,6 +189,64 @@ class HubClient:
             print(f"{self.host}:{self.port} connection refused")
         return None
 
+    def poll_logs(
+        self,
+        repo_address: RepoAddress,
+        job_heads: List[JobHead],
+        start_time: int,
+        attached: bool,
+    ) -> Generator[LogEvent, None, None]:
+        url = _url(
+            scheme="http",
+            host=f"{self.host}:{self.port}",
+            path=f"api/hub/{self.hub_name}/logs/poll",
+        )
+        # A client that falls behind the hub is disconnected with a lagged event, and reconnects
+        # from the timestamp of the last event it got. The events of that timestamp it already
+        # got are skipped.
+        last_timestamp = None
+        last_events = []
+        try:
+            headers = HubClient._auth(token=self.token)
+            headers["Content-type"] = "application/json"
+            while True:
+                lagged = False
+                replayed_events = Counter(last_events)
+                with requests.post(
+                    url=url,
+                    headers=headers,
+                    data=PollLogs(
+                        repo_address=repo_address,
+                        job_heads=job_heads,
+                        start_time=start_time if last_timestamp is None else last_timestamp,
+                        attached=attached,
+                    ).json(),
+                    stream=True,
+                ) as resp:
+                    if resp.status_code == 401:
+                        print("Unauthorized. Please set correct token")
+                        return
+                    if not resp.ok:
+                        return
+                    for line in resp.iter_lines(decode_unicode=True):
+                        if line == "event: lagged":
+                            lagged = True
+                        elif line.startswith("data: ") and not lagged:
+                            event = LogEvent.parse_raw(line[len("data: ") :])
+                            event_key = (event.event_id, event.job_id, event.log_message)
+                            if event.timestamp == last_timestamp and replayed_events[event_key]:
+                                replayed_events[event_key] -= 1
+                                continue
+                            if event.timestamp != last_timestamp:
+                                last_timestamp = event.timestamp
+                                last_events = []
+                            last_events.append(event_key)
+                            yield event
+                if not lagged:
+                    return
+        except requests.ConnectionError:
+            print(f"{self.host}:{self.port} connection refused")
+
     def get_tag_head(self, repo_address: RepoAddress, tag_name: str) -> Optional[TagHead]:
         url = _url(
             scheme="http",
@@ -1,3 +1,5 @@
+import os
+import threading
 from pathlib import Path
 from typing import Generator, List, Optional, Tuple
 
@@ -7,10 +9,13 @@ from dstack.backend.base import repos as base_repos
 from dstack.backend.base import runs as base_runs
 from dstack.backend.base import secrets as base_secrets
 from dstack.backend.base import tags as base_tags
+from dstack.backend.base.cache import CachingStorage
+from dstack.backend.base.storage import Storage
 from dstack.backend.local import artifacts, logs, tags
 from dstack.backend.local.compute import LocalCompute
 from dstack.backend.local.config import LocalConfig
 from dstack.backend.local.secrets import LocalSecretsManager
+from dstack.backend.local.sqlite import DB_FILENAME, SQLiteStorage, migrate_files_to_sqlite
 from dstack.backend.local.storage import LocalStorage
 from dstack.core.artifact import Artifact
 from dstack.core.job import Job, JobHead
@@ -26,7 +31,7 @@ class LocalBackend(Backend):
         self.backend_config = LocalConfig()
         self.backend_config.load()
         self._loaded = True
-        self._storage = LocalStorage(self.backend_config.path)
+        self._storage = CachingStorage(_create_storage(self.backend_config))
         self._compute = LocalCompute()
         self._secrets_manager = LocalSecretsManager(self.backend_config.path)
 
@@ -59,6 +64,9 @@ class LocalBackend(Backend):
     def stop_job(self, repo_address: RepoAddress, job_id: str, abort: bool):
         base_jobs.stop_job(self._storage, self._compute, repo_address, job_id, abort)
 
+    def stop_jobs(self, repo_address: RepoAddress, run_name: Optional[str], abort: bool):
+        base_jobs.stop_jobs(self._storage, self._compute, repo_address, run_name, abort)
+
     def list_job_heads(
         self, repo_address: RepoAddress, run_name: Optional[str] = None
     ) -> List[JobHead]:
@@ -67,26 +75,50 @@ class LocalBackend(Backend):
     def delete_job_head(self, repo_address: RepoAddress, job_id: str):
         base_jobs.delete_job_head(self._storage, repo_address, job_id)
 
+    def delete_job_heads(
+        self, repo_address: RepoAddress, run_name: Optional[str]
+    ) -> List[JobHead]:
+        job_heads = base_jobs.delete_job_heads(self._storage, repo_address, run_name)
+        base_runs.delete_run_name_claims(self._storage, list({h.run_name for h in job_heads}))
+        return job_heads
+
     def list_run_heads(
         self,
         repo_address: RepoAddress,
         run_name: Optional[str] = None,
         include_request_heads: bool = True,
     ) -> List[RunHead]:
-        job_heads = self.list_job_heads(repo_address, run_name)
-        return base_runs.get_run_heads(
-            self._storage, self._compute, job_heads, include_request_heads
+        return base_runs.list_run_heads(
+            self._storage, self._compute, repo_address, run_name, include_request_heads
         )
 
+    def iter_recent_job_heads(self, repo_address: RepoAddress) -> Generator[JobHead, None, None]:
+        return base_runs.iter_recent_job_heads(self._storage, repo_address)
+
+    def get_last_done_run_name(
+        self, repo_address: RepoAddress, workflow_name: str
+    ) -> Optional[str]:
+        return base_runs.get_last_done_run_name(self._storage, repo_address, workflow_name)
+
+    def reindex_runs(self, repo_address: RepoAddress) -> int:
+        return base_runs.reindex_runs(self._storage, repo_address)
+
     def poll_logs(
         self,
         repo_address: RepoAddress,
         job_heads: List[JobHead],
         start_time: int,
         attached: bool,
+        stopped: Optional[threading.Event] = None,
     ) -> Generator[LogEvent, None, None]:
         return logs.poll_logs(
-            self._storage, self._compute, repo_address, job_heads, start_time, attached
+            self._storage,
+            self._compute,
+            repo_address,
+            job_heads,
+            start_time,
+            attached,
+            stopped,
         )
 
     def list_run_artifact_files(
@@ -175,3 +207,14 @@ class LocalBackend(Backend):
 
     def get_artifacts_path(self, repo_address: RepoAddress) -> Path:
         return artifacts.get_artifacts_path(self.backend_config.path, repo_address)
+
+
+def _create_storage(backend_config: LocalConfig) -> Storage:
+    if backend_config.storage == "sqlite":
+        if not os.path.exists(os.path.join(backend_config.path, DB_FILENAME)):
+            # Switching to SQLite for the first time imports the existing file layout
+            migrate_files_to_sqlite(backend_config.path)
+        storage = SQLiteStorage(backend_config.path)
+        storage.move_files_keys_to_files()
+        return storage
+    return LocalStorage(backend_config.path)
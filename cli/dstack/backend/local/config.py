@@ -9,6 +9,7 @@ class LocalConfig(BackendConfig):
     def __init__(self):
         super().__init__()
         self.path = get_dstack_dir()
+        self.storage = "files"
 
     def load(self, path: Path = get_config_path()):
         super().load(path=path)
@@ -16,12 +17,15 @@ class LocalConfig(BackendConfig):
             with path.open() as f:
                 config_data = yaml.load(f, Loader=yaml.FullLoader)
                 self.path = config_data.get("path") or get_dstack_dir()
+                self.storage = config_data.get("storage") or "files"
 
     def save(self, path: Path = get_config_path()):
         if not path.parent.exists():
             path.parent.mkdir(parents=True)
         with path.open("w") as f:
             config_data = {"backend": "local", "path": self.path}
+            if self.storage != "files":
+                config_data["storage"] = self.storage
             yaml.dump(config_data, f)
 
     def configure(self):
@@ -1,33 +1,36 @@
-import os.path
+import os
+import threading
 import time
 from pathlib import Path
 from typing import Any, Dict, Generator, List, Optional, Tuple
 
-from pygtail import Pygtail
-
-from dstack.backend.base import jobs, runs
+from dstack.backend.base import jobs
 from dstack.backend.base.compute import Compute
-from dstack.backend.base.logs import render_log_message
+from dstack.backend.base.logs import are_jobs_finished, merge_log_events, render_log_message
 from dstack.backend.base.storage import Storage
+from dstack.backend.local.tail import FileTail, LogIndex, Watcher
 from dstack.core.job import JobHead
 from dstack.core.log_event import LogEvent
 from dstack.core.repo import RepoAddress
 
 WAIT_N_ONCE_FINISHED = 1
 
-CHECK_STATUS_EVERY_N = 3
-
-POLL_LOGS_RATE_SECS = 1
+CHECK_STATUS_RATE_SECS = 1
 
 
 def events_loop(
-    storage: Storage, compute: Compute, repo_address: RepoAddress, job_heads: List[JobHead]
+    storage: Storage,
+    compute: Compute,
+    repo_address: RepoAddress,
+    job_heads: List[JobHead],
+    start_time: Optional[int] = None,
+    stopped: Optional[threading.Event] = None,
 ):
-    counter = 0
     finished_counter = 0
     tails = {}
+    dir_paths = set()
 
-    _jobs = [jobs.get_job(storage, repo_address, job_head.job_id) for job_head in job_heads]
+    _jobs = jobs.get_jobs(storage, repo_address, [job_head.job_id for job_head in job_heads])
     for _job in _jobs:
         path_dir = (
             Path.home()
@@ -45,18 +48,25 @@ def events_loop(
             path_dir.mkdir(parents=True)
             f = open(path_dir / file_log, "w")
             f.close()
-        tails[_job.job_id] = Pygtail(
-            os.path.join(path_dir, file_log), save_on_end=False, copytruncate=False
-        )
-
-    while True:
-        if counter % CHECK_STATUS_EVERY_N == 0:
-            _jobs = [
-                jobs.get_job(storage, repo_address, job_head.job_id) for job_head in job_heads
-            ]
+        path_log = os.path.join(path_dir, file_log)
+        offset = LogIndex(path_log).find_offset(start_time) if start_time else 0
+        tails[_job.job_id] = FileTail(path_log, offset)
+        dir_paths.add(str(path_dir))
 
+    # New lines are read as soon as the watcher reports a change, while the job statuses are
+    # checked at a fixed rate
+    watcher = Watcher(sorted(dir_paths))
+    try:
+        check_status_at = time.monotonic()
+        while stopped is None or not stopped.is_set():
+            behind = False
             for _job in _jobs:
-                for line_log in tails[_job.job_id]:
+                tail = tails[_job.job_id]
+                lines = tail.read_lines()
+                if lines:
+                    watcher.changed()
+                behind = behind or tail.behind
+                for line_log in lines:
                     yield {
                         "message": {
                             "source": "stdout",
@@ -64,18 +74,20 @@ def events_loop(
                             "job_id": _job.job_id,
                         },
                         "eventId": _job.runner_id,
-                        "timestamp": time.time(),
+                        "timestamp": int(time.time() * 1000),
                     }
 
-            run = next(
-                iter(runs.get_run_heads(storage, compute, _jobs, include_request_heads=False))
-            )
-            if run.status.is_finished():
-                if finished_counter == WAIT_N_ONCE_FINISHED:
-                    break
-                finished_counter += 1
-        counter = counter + 1
-        time.sleep(POLL_LOGS_RATE_SECS)
+            # Jobs that are finished are still read to the end
+            if not behind and time.monotonic() >= check_status_at:
+                if are_jobs_finished(storage, repo_address, job_heads):
+                    if finished_counter == WAIT_N_ONCE_FINISHED:
+                        break
+                    finished_counter += 1
+                check_status_at = time.monotonic() + CHECK_STATUS_RATE_SECS
+            if not behind:
+                watcher.wait(max(0.0, check_status_at - time.monotonic()))
+    finally:
+        watcher.close()
 
 
 def poll_logs(
@@ -85,15 +97,18 @@ def poll_logs(
     job_heads: List[JobHead],
     start_time: int,
     attached: bool,
+    stopped: Optional[threading.Event] = None,
 ) -> Generator[LogEvent, None, None]:
-    job_host_names = {}
-    job_ports = {}
-    job_app_specs = {}
-    try:
-        # Read log_file
-        for event in events_loop(storage, compute, repo_address, job_heads):
-            yield render_log_message(
-                storage, event, repo_address, job_host_names, job_ports, job_app_specs
+    # Every job has its own log file, so the jobs are tailed concurrently and their events merged
+    rewriters = {}
+    yield from merge_log_events(
+        [
+            (
+                render_log_message(storage, event, repo_address, rewriters)
+                for event in events_loop(
+                    storage, compute, repo_address, [job_head], start_time, stopped
+                )
             )
-    except Exception as e:
-        raise e
+            for job_head in job_heads
+        ]
+    )
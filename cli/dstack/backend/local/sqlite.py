@@ -0,0 +1,190 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Generator, List, Optional
+
+from dstack.backend.base.storage import Storage
+from dstack.backend.local.storage import LocalStorage
+
+DB_FILENAME = "storage.db"
+
+# The runner reads and writes these keys as plain files, so they stay in the file layout
+FILES_KEYS_PREFIXES = ["jobs/", "runners/", "secrets/"]
+
+# Top-level directories of the file layout that only the CLI reads and writes
+MIGRATED_DIRS = ["repos", "run-names", "runs", "tags"]
+
+LIST_BATCH_SIZE = 1000
+
+_UPSERT = (
+    "INSERT INTO kv(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value"
+)
+
+
+class SQLiteStorage(Storage):
+    def __init__(self, root_path: str, files_keys_prefixes: Optional[List[str]] = None):
+        self.root_path = root_path
+        self.db_path = os.path.join(root_path, DB_FILENAME)
+        self.files_keys_prefixes = (
+            files_keys_prefixes if files_keys_prefixes is not None else FILES_KEYS_PREFIXES
+        )
+        self._files = LocalStorage(root_path)
+        self._con = None
+        self._lock = threading.Lock()
+
+    def put_object(self, key: str, content: str, metadata: Optional[Dict] = None):
+        if self._is_files_key(key):
+            self._files.put_object(key, content, metadata)
+            return
+        with self._lock, self._connection() as con:
+            con.execute(_UPSERT, (key, content))
+
+    def put_object_if_absent(self, key: str, content: str) -> bool:
+        if self._is_files_key(key):
+            return self._files.put_object_if_absent(key, content)
+        with self._lock, self._connection() as con:
+            cursor = con.execute(
+                "INSERT INTO kv(key, value) VALUES(?, ?) ON CONFLICT(key) DO NOTHING",
+                (key, content),
+            )
+            return cursor.rowcount == 1
+
+    def get_object(self, key: str) -> Optional[str]:
+        if self._is_files_key(key):
+            return self._files.get_object(key)
+        with self._lock:
+            row = self._connection().execute("SELECT value FROM kv WHERE key=?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def delete_object(self, key: str):
+        if self._is_files_key(key):
+            self._files.delete_object(key)
+            return
+        with self._lock, self._connection() as con:
+            con.execute("DELETE FROM kv WHERE key=?", (key,))
+
+    def iter_objects(
+        self,
+        keys_prefix: str,
+        start_after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Generator[str, None, None]:
+        if self._is_files_key(keys_prefix):
+            yield from self._files.iter_objects(keys_prefix, start_after, limit)
+            return
+        if start_after is not None and start_after >= keys_prefix:
+            lower_key, lower_op = start_after, ">"
+        else:
+            lower_key, lower_op = keys_prefix, ">="
+        upper_key = _get_prefix_upper_bound(keys_prefix)
+        count = 0
+        # Fetches in batches so that the lock isn't held while the caller consumes keys
+        while limit is None or count < limit:
+            batch_size = LIST_BATCH_SIZE if limit is None else min(LIST_BATCH_SIZE, limit - count)
+            query = f"SELECT key FROM kv WHERE key {lower_op} ?"
+            params = [lower_key]
+            if upper_key is not None:
+                query += " AND key < ?"
+                params.append(upper_key)
+            query += " ORDER BY key LIMIT ?"
+            params.append(batch_size)
+            with self._lock:
+                keys = [row[0] for row in self._connection().execute(query, params)]
+            yield from keys
+            count += len(keys)
+            if len(keys) < batch_size:
+                break
+            lower_key, lower_op = keys[-1], ">"
+
+    def put_objects(self, objects: Dict[str, str]):
+        files_objects = {k: v for k, v in objects.items() if self._is_files_key(k)}
+        if files_objects:
+            self._files.put_objects(files_objects)
+        rows = [(k, v) for k, v in objects.items() if not self._is_files_key(k)]
+        if rows:
+            with self._lock, self._connection() as con:
+                con.executemany(_UPSERT, rows)
+
+    def get_objects(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        objects = self._files.get_objects([k for k in keys if self._is_files_key(k)])
+        db_keys = [k for k in keys if not self._is_files_key(k)]
+        with self._lock:
+            con = self._connection()
+            # Stays below SQLITE_MAX_VARIABLE_NUMBER of old SQLite builds
+            for i in range(0, len(db_keys), 500):
+                chunk = db_keys[i : i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                objects.update(
+                    con.execute(f"SELECT key, value FROM kv WHERE key IN ({placeholders})", chunk)
+                )
+        return {key: objects.get(key) for key in keys}
+
+    def delete_objects(self, keys: List[str]):
+        files_keys = [k for k in keys if self._is_files_key(k)]
+        if files_keys:
+            self._files.delete_objects(files_keys)
+        rows = [(k,) for k in keys if not self._is_files_key(k)]
+        if rows:
+            with self._lock, self._connection() as con:
+                con.executemany("DELETE FROM kv WHERE key=?", rows)
+
+    def _is_files_key(self, key: str) -> bool:
+        return any(key.startswith(p) for p in self.files_keys_prefixes)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._con is None:
+            Path(self.root_path).mkdir(parents=True, exist_ok=True)
+            # Thread-safety is provided by self._lock
+            con = sqlite3.connect(self.db_path, check_same_thread=False)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL) "
+                "WITHOUT ROWID"
+            )
+            con.commit()
+            self._con = con
+        return self._con
+
+    def move_files_keys_to_files(self):
+        # Earlier versions kept secret heads in the database, where the runner can't see them
+        with self._lock:
+            con = self._connection()
+            rows = []
+            for prefix in self.files_keys_prefixes:
+                rows.extend(
+                    con.execute(
+                        "SELECT key, value FROM kv WHERE key >= ? AND key < ?",
+                        (prefix, _get_prefix_upper_bound(prefix)),
+                    )
+                )
+            if not rows:
+                return
+            self._files.put_objects(dict(rows))
+            with con:
+                con.executemany("DELETE FROM kv WHERE key=?", [(key,) for key, _ in rows])
+
+
+def migrate_files_to_sqlite(root_path: str) -> int:
+    storage = SQLiteStorage(root_path)
+    objects = {}
+    for dir_name in MIGRATED_DIRS:
+        dir_path = os.path.join(root_path, dir_name)
+        for root, _, filenames in os.walk(dir_path):
+            for filename in filenames:
+                filepath = os.path.join(root, filename)
+                with open(filepath) as f:
+                    objects[str(Path(filepath).relative_to(root_path))] = f.read()
+    # A single transaction, so an interrupted migration leaves nothing behind. The database is
+    # created even if there is nothing to migrate, so the migration runs only once.
+    with storage._lock, storage._connection() as con:
+        con.executemany(_UPSERT, objects.items())
+    return len(objects)
+
+
+def _get_prefix_upper_bound(keys_prefix: str) -> Optional[str]:
+    # The smallest key that is greater than all keys starting with keys_prefix
+    if not keys_prefix:
+        return None
+    return keys_prefix[:-1] + chr(ord(keys_prefix[-1]) + 1)
@@ -1,6 +1,7 @@
 import os
+import uuid
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Generator, List, Optional, Tuple
 
 from dstack.backend.base.storage import Storage
 
@@ -16,6 +17,13 @@ class LocalStorage(Storage):
             Body=content,
         )
 
+    def put_object_if_absent(self, key: str, content: str) -> bool:
+        return _put_object_if_absent(
+            Root=self.root_path,
+            Key=key,
+            Body=content,
+        )
+
     def get_object(self, key: str) -> Optional[str]:
         try:
             return _get_object(
@@ -25,42 +33,110 @@ class LocalStorage(Storage):
         except IOError:
             return None
 
+    def get_object_if_modified(
+        self, key: str, etag: Optional[str]
+    ) -> Tuple[bool, Optional[str], Optional[str]]:
+        try:
+            stat = os.stat(os.path.join(self.root_path, key))
+        except OSError:
+            return True, None, None
+        current_etag = f"{stat.st_mtime_ns}-{stat.st_size}"
+        if current_etag == etag:
+            return False, None, etag
+        return True, self.get_object(key), current_etag
+
     def delete_object(self, key: str):
         return _delete_object(
             Root=self.root_path,
             Key=key,
         )
 
-    def list_objects(self, keys_prefix: str) -> List[str]:
-        return _list_objects(
+    def iter_objects(
+        self,
+        keys_prefix: str,
+        start_after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Generator[str, None, None]:
+        return _iter_objects(
             Root=self.root_path,
             Prefix=keys_prefix,
+            StartAfter=start_after,
+            MaxKeys=limit,
         )
 
+    def put_objects(self, objects: Dict[str, str]):
+        for key, content in objects.items():
+            _put_object(
+                Root=self.root_path,
+                Key=key,
+                Body=content,
+            )
+
+    def get_objects(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        return {key: self.get_object(key) for key in keys}
 
-def _list_objects(Root: str, Prefix: str, MaxKeys: Optional[int] = None) -> List[str]:
+    def delete_objects(self, keys: List[str]):
+        for key in keys:
+            _delete_object(
+                Root=self.root_path,
+                Key=key,
+            )
+
+
+def _iter_objects(
+    Root: str,
+    Prefix: str,
+    StartAfter: Optional[str] = None,
+    MaxKeys: Optional[int] = None,
+) -> Generator[str, None, None]:
     prefix_path = Path.joinpath(Root, Prefix)
     parent_dir = prefix_path.parent
     file_prefix = prefix_path.name
     if not os.path.exists(parent_dir):
-        return []
-    l = []
+        return
     count_keys = 0
-    for file in os.listdir(parent_dir):
+    # Sorted to match the lexicographical order of S3 listings
+    for file in sorted(os.listdir(parent_dir)):
         if file.startswith(file_prefix):
-            if MaxKeys:
-                if count_keys == MaxKeys:
-                    break
-            l.append(str(Path(parent_dir, file).relative_to(Root)))
+            if MaxKeys is not None and count_keys == MaxKeys:
+                break
+            key = str(Path(parent_dir, file).relative_to(Root))
+            if StartAfter and key <= StartAfter:
+                continue
+            yield key
             count_keys += 1
-    return l
 
 
 def _put_object(Root: str, Key: str, Body: str):
     filepath = os.path.join(Root, Key)
     Path(filepath).parent.mkdir(exist_ok=True, parents=True)
-    with open(filepath, "w+") as f:
+    # Replaced atomically, so that concurrent readers never see a partially written object
+    tmp_filepath = _get_tmp_filepath(filepath)
+    try:
+        with open(tmp_filepath, "w") as f:
+            f.write(Body)
+        os.replace(tmp_filepath, filepath)
+    except BaseException:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+        raise
+
+
+def _put_object_if_absent(Root: str, Key: str, Body: str) -> bool:
+    filepath = os.path.join(Root, Key)
+    Path(filepath).parent.mkdir(exist_ok=True, parents=True)
+    # The content is written to a temporary file first, so that the object appears atomically
+    # and complete. Linking fails if the object exists, also if it's created concurrently.
+    tmp_filepath = _get_tmp_filepath(filepath)
+    with open(tmp_filepath, "w") as f:
         f.write(Body)
+    try:
+        os.link(tmp_filepath, filepath)
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(tmp_filepath)
+    return True
 
 
 def _get_object(Root: str, Key: str):
@@ -73,6 +149,11 @@ def _get_object(Root: str, Key: str):
     return body or ""
 
 
+def _get_tmp_filepath(filepath: str) -> str:
+    # Dot-prefixed, so that it doesn't match key prefixes while it exists
+    return os.path.join(os.path.dirname(filepath), f".tmp-{uuid.uuid4().hex}")
+
+
 def _delete_object(Root: str, Key: str):
     if not os.path.exists(Root):
         return
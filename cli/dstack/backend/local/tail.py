@@ -0,0 +1,187 @@
+import bisect
+import ctypes
+import ctypes.util
+import mmap
+import os
+import select
+import struct
+import time
+from typing import List, Optional, Tuple
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_EVENT_SIZE = struct.calcsize("iIII")
+
+MIN_POLL_RATE_SECS = 0.05
+
+MAX_POLL_RATE_SECS = 1
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Records of log indexes, written by the runner: a timestamp in milliseconds and the offset
+# of the end of the last line written by then
+INDEX_RECORD = struct.Struct("<qq")
+
+INDEX_RATE_MILLIS = 1000
+
+
+class FileTail:
+    # Reads the lines appended to a file since the previous call. A trailing line without
+    # a newline is held back until it's complete.
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        self.offset = offset
+        # Whether the file had more data than the last call returned
+        self.behind = False
+        self._partial = b""
+
+    def read_lines(self) -> List[str]:
+        try:
+            with open(self.path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < self.offset:
+                    # The file was truncated or replaced
+                    self.offset = 0
+                    self._partial = b""
+                f.seek(self.offset)
+                data = f.read(READ_CHUNK_SIZE)
+        except FileNotFoundError:
+            return []
+        self.behind = self.offset + len(data) < size
+        if not data:
+            return []
+        self.offset += len(data)
+        data = self._partial + data
+        end = data.rfind(b"\n") + 1
+        self._partial = data[end:]
+        return [line.decode(errors="replace") for line in data[:end].splitlines(keepends=True)]
+
+
+class LogIndex:
+    # A sparse index of a log file, stored next to it in <log>.idx. The log has no timestamps, so
+    # the runner adds records as it writes it: a record (T, O) means that the first O bytes, which
+    # end with a complete line, were written by T. A reader that starts at a time skips to the
+    # offset of the last record before it, found by a binary search over the memory-mapped index.
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+        self.path = log_path + ".idx"
+
+    def find_offset(self, timestamp: int) -> int:
+        self._index_tail()
+        try:
+            with open(self.path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < INDEX_RECORD.size:
+                    return 0
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    records = _IndexRecords(m, size // INDEX_RECORD.size)
+                    i = bisect.bisect_right(records, timestamp)
+                    return INDEX_RECORD.unpack_from(m, (i - 1) * INDEX_RECORD.size)[1] if i else 0
+        except FileNotFoundError:
+            return 0
+
+    def _index_tail(self):
+        # Logs written by runners that don't index them, and the lines a runner wrote after its
+        # last record, are covered by a record of the whole file at its modification time. It's
+        # added only once the file is idle, so that it can't interleave with the runner's records.
+        try:
+            with open(self.log_path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_size == 0:
+                    return
+                f.seek(stat.st_size - 1)
+                ends_with_line = f.read(1) == b"\n"
+        except FileNotFoundError:
+            return
+        modified_at = int(stat.st_mtime * 1000)
+        if not ends_with_line or time.time() * 1000 - modified_at < INDEX_RATE_MILLIS:
+            return
+        last_timestamp, last_offset = self._read_last_record() or (0, 0)
+        if stat.st_size <= last_offset or modified_at < last_timestamp:
+            return
+        with open(self.path, "ab") as f:
+            f.write(INDEX_RECORD.pack(modified_at, stat.st_size))
+
+    def _read_last_record(self) -> Optional[Tuple[int, int]]:
+        try:
+            with open(self.path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < INDEX_RECORD.size:
+                    return None
+                f.seek(size - size % INDEX_RECORD.size - INDEX_RECORD.size)
+                return INDEX_RECORD.unpack(f.read(INDEX_RECORD.size))
+        except FileNotFoundError:
+            return None
+
+
+class _IndexRecords:
+    # Timestamps of the index records as a sequence, for bisect
+    def __init__(self, m: mmap.mmap, count: int):
+        self._m = m
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> int:
+        return INDEX_RECORD.unpack_from(self._m, i * INDEX_RECORD.size)[0]
+
+
+class Watcher:
+    # Waits for changes of files in the given directories. Uses inotify on Linux, and otherwise
+    # polls with a rate that backs off while nothing changes.
+    def __init__(self, dir_paths: List[str]):
+        self._fd = _inotify_init(dir_paths)
+        self._poll_rate = MIN_POLL_RATE_SECS
+
+    def wait(self, timeout: float):
+        if self._fd is None:
+            time.sleep(min(timeout, self._poll_rate))
+            self._poll_rate = min(self._poll_rate * 2, MAX_POLL_RATE_SECS)
+            return
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if readable:
+            # Only the fact of a change matters, so the events are drained without parsing
+            try:
+                while os.read(self._fd, 64 * INOTIFY_EVENT_SIZE):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def changed(self):
+        # Called by the caller when new data was found, so that polling speeds up again
+        self._poll_rate = MIN_POLL_RATE_SECS
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def _inotify_init(dir_paths: List[str]) -> Optional[int]:
+    libc_name = ctypes.util.find_library("c")
+    if not libc_name:
+        return None
+    try:
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        inotify_init1 = libc.inotify_init1
+        inotify_add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    fd = inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        return None
+    for dir_path in dir_paths:
+        wd = inotify_add_watch(
+            fd, os.fsencode(dir_path), IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        )
+        if wd < 0:
+            os.close(fd)
+            return None
+    return fd
@@ -2,11 +2,12 @@ import sys
 from argparse import Namespace
 
 from dstack.api.backend import list_backends
-from dstack.api.logs import poll_logs
+from dstack.api.logs import export_logs, poll_backends_logs
 from dstack.api.repo import load_repo_data
 from dstack.cli.commands import BasicCommand
+from dstack.cli.common import console
 from dstack.core.error import check_config, check_git
-from dstack.utils.common import since
+from dstack.utils.common import since, sizeof_fmt
 
 
 class LogCommand(BasicCommand):
@@ -37,18 +38,35 @@ class LogCommand(BasicCommand):
             type=str,
             default="1d",
         )
+        self._parser.add_argument(
+            "--export",
+            metavar="FILE",
+            help="Export the logs to a file instead of displaying them. Files ending with .gz "
+            "get gzip-compressed NDJSON, other files get plain text.",
+            type=str,
+        )
 
     @check_config
     @check_git
     def _command(self, args: Namespace):
+        if args.export and args.attach:
+            sys.exit("--export can't be used with --attach")
         repo_data = load_repo_data()
-        anyone = False
+        start_time = since(args.since)
+        backends_job_heads = []
         for backend in list_backends():
-            start_time = since(args.since)
             job_heads = backend.list_job_heads(repo_data, args.run_name)
             if job_heads:
-                anyone = True
-                poll_logs(backend, repo_data, job_heads, start_time, args.attach)
+                backends_job_heads.append((backend, job_heads))
 
-        if not anyone:
+        if not backends_job_heads:
             sys.exit(f"Cannot find the run '{args.run_name}'")
+        if args.export:
+            stats = export_logs(backends_job_heads, repo_data, start_time, None, args.export)
+            console.print(
+                f"Exported {stats.events} events ({sizeof_fmt(stats.bytes_written)}) "
+                f"in {stats.secs:.1f}s, "
+                f"{stats.events / max(stats.secs, 0.001):.0f} events/s"
+            )
+            return
+        poll_backends_logs(backends_job_heads, repo_data, start_time, args.attach)
@@ -0,0 +1,28 @@
+from argparse import Namespace
+
+from rich import print
+
+from dstack.api.backend import list_backends
+from dstack.api.repo import load_repo_data
+from dstack.cli.commands import BasicCommand
+from dstack.core.error import check_config, check_git
+
+
+class MigrateCommand(BasicCommand):
+    NAME = "migrate"
+    DESCRIPTION = "Migrate runs to the latest storage layout"
+
+    def __init__(self, parser):
+        super(MigrateCommand, self).__init__(parser)
+
+    def register(self):
+        pass
+
+    @check_config
+    @check_git
+    def _command(self, args: Namespace):
+        repo_data = load_repo_data()
+        for backend in list_backends():
+            runs_count = backend.reindex_runs(repo_data)
+            print(f"Migrated {runs_count} run(s) in the [bold]{backend.name}[/bold] backend")
+        print(f"[grey58]OK[/]")
@@ -42,17 +42,8 @@ class RMCommand(BasicCommand):
             repo_data = load_repo_data()
             deleted_run = False
             for backend in list_backends():
-                job_heads = backend.list_job_heads(repo_data, args.run_name)
-                if job_heads:
-                    finished_job_heads = []
-                    for job_head in job_heads:
-                        if job_head.status.is_finished():
-                            finished_job_heads.append(job_head)
-                        elif args.run_name:
-                            sys.exit("The run is not finished yet. Stop the run first.")
-                    for job_head in finished_job_heads:
-                        backend.delete_job_head(repo_data, job_head.job_id)
-                        deleted_run = True
+                if backend.delete_job_heads(repo_data, args.run_name):
+                    deleted_run = True
             if args.run_name and not deleted_run:
                 sys.exit(f"Cannot find the run '{args.run_name}'")
             print(f"[grey58]OK[/]")
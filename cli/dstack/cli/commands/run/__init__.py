@@ -1,12 +1,14 @@
 import argparse
+import codecs
 import os
-import re
 import sys
+import threading
 import time
+import uuid
 from argparse import Namespace
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-from urllib import parse
+from queue import Queue
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import pkg_resources
 import websocket
@@ -15,14 +17,15 @@ from cursor import cursor
 from jsonschema import ValidationError, validate
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.prompt import Confirm
-from websocket import WebSocketApp
+from websocket import ABNF, WebSocketException, WebSocketTimeoutException
 
 from dstack import providers
 from dstack.api.backend import DEFAULT, DEFAULT_REMOTE, get_backend_by_name
-from dstack.api.logs import poll_logs
+from dstack.api.logs import LogWriter, poll_logs
 from dstack.api.repo import load_repo_data
 from dstack.api.run import list_runs_with_merged_backends
 from dstack.backend.base import Backend
+from dstack.backend.base.logs import LogRewriter
 from dstack.cli.commands import BasicCommand
 from dstack.cli.common import console, print_runs
 from dstack.core.error import check_backend, check_config, check_git
@@ -37,6 +40,16 @@ POLL_PROVISION_RATE_SECS = 3
 
 POLL_FINISHED_STATE_RATE_SECS = 1
 
+WS_QUEUE_SIZE = 10000
+
+WS_TIMEOUT_SECS = 30
+
+WS_RECONNECT_MIN_SECS = 0.5
+
+WS_RECONNECT_MAX_SECS = 8
+
+_WS_FINISHED = object()
+
 
 def _load_workflows_from_file(workflows_file: Path) -> List[Any]:
     workflows_yaml = yaml.load(workflows_file.open(), Loader=yaml.FullLoader)
@@ -89,66 +102,82 @@ def parse_run_args(
 
 def poll_logs_ws(backend: Backend, repo_address: RepoAddress, job_head: JobHead):
     job = backend.get_job(repo_address, job_head.job_id)
-
-    def on_message(ws: WebSocketApp, message):
-        pat = re.compile(
-            f"http://(localhost|0.0.0.0|127.0.0.1|{job.host_name}):[\\S]*[^(.+)\\s\\n\\r]"
-        )
-        if re.search(pat, message):
-            if job.host_name and job.ports and job.app_specs:
-                for app_spec in job.app_specs:
-                    port = job.ports[app_spec.port_index]
-                    url_path = app_spec.url_path or ""
-                    url_query_params = app_spec.url_query_params
-                    url_query = (
-                        ("?" + parse.urlencode(url_query_params)) if url_query_params else ""
-                    )
-                    app_url = f"http://{job.host_name}:{port}"
-                    if url_path or url_query_params:
-                        app_url += "/"
-                        if url_query_params:
-                            app_url += url_query
-                    message = re.sub(pat, app_url, message)
-        sys.stdout.write(message)
-
-    def on_error(_: WebSocketApp, err: Exception):
-        if isinstance(err, KeyboardInterrupt):
-            run_name = job_head.run_name
-            if Confirm.ask(f"\n [red]Abort the run '{run_name}'?[/]"):
-                backend.stop_jobs(repo_address, run_name, abort=True)
-                console.print(f"[grey58]OK[/]")
-        else:
-            console.print(str(err))
-
-    def on_open(_: WebSocketApp):
-        pass
-
-    def on_close(_: WebSocketApp, close_status_code, close_msg):
-        pass
-
-    url = f"ws://{job.host_name}:{job.env['WS_LOGS_PORT']}/logsws"
-    cursor.hide()
-    _ws = websocket.WebSocketApp(
-        url,
-        on_message=on_message,
-        on_error=on_error,
-        on_open=on_open,
-        on_close=on_close,
+    rewriter = LogRewriter.from_job(job)
+    run_name = job_head.run_name
+
+    def is_finished() -> bool:
+        # A run that was deleted meanwhile counts as finished
+        run_heads = backend.list_run_heads(repo_address, run_name)
+        return not run_heads or run_heads[0].status.is_finished()
+
+    # The runner keeps the position of every client id, so a reconnect resumes where the
+    # previous connection stopped
+    url = f"ws://{job.host_name}:{job.env['WS_LOGS_PORT']}/logsws?cli={uuid.uuid4().hex}"
+    queue = Queue(maxsize=WS_QUEUE_SIZE)
+    stopped = threading.Event()
+    thread = threading.Thread(
+        target=_receive_logs_ws, args=(url, queue, is_finished, stopped), daemon=True
     )
-    _ws.run_forever()
-    cursor.show()
-
+    cursor.hide()
     try:
-        while True:
-            _job_head = backend.get_job(repo_address, job_head.job_id)
-            run = backend.list_run_heads(repo_address, _job_head.run_name)[0]
-            if run.status.is_finished():
-                break
+        with LogWriter() as writer:
+            thread.start()
+            while True:
+                message = queue.get()
+                if message is _WS_FINISHED:
+                    break
+                writer.write(rewriter.rewrite(message))
+        # The runner closes the stream once the container exits, before the artifacts are
+        # uploaded
+        while not is_finished():
             time.sleep(POLL_FINISHED_STATE_RATE_SECS)
     except KeyboardInterrupt:
-        if Confirm.ask(f"\n [red]Abort the run '{job.run_name}'?[/]"):
-            backend.stop_jobs(repo_address, job.run_name, abort=True)
+        stopped.set()
+        if Confirm.ask(f"\n [red]Abort the run '{run_name}'?[/]"):
+            backend.stop_jobs(repo_address, run_name, abort=True)
             console.print(f"[grey58]OK[/]")
+    finally:
+        cursor.show()
+
+
+def _receive_logs_ws(
+    url: str, queue: Queue, is_finished: Callable[[], bool], stopped: threading.Event
+):
+    # Puts the messages of the runner into the queue until the runner closes the socket, which
+    # it does once the container has exited and all its output was sent. The queue is bounded,
+    # so a slow terminal holds up the socket rather than memory growing.
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    reconnect_secs = WS_RECONNECT_MIN_SECS
+    try:
+        while not stopped.is_set():
+            try:
+                ws = websocket.create_connection(url, timeout=WS_TIMEOUT_SECS)
+            except (OSError, WebSocketException):
+                # The runner is gone if the job has finished
+                if is_finished():
+                    return
+                time.sleep(reconnect_secs)
+                reconnect_secs = min(reconnect_secs * 2, WS_RECONNECT_MAX_SECS)
+                continue
+            reconnect_secs = WS_RECONNECT_MIN_SECS
+            try:
+                while not stopped.is_set():
+                    try:
+                        opcode, data = ws.recv_data()
+                    except WebSocketTimeoutException:
+                        # The runner sends nothing while the job is silent, so a dead connection
+                        # is only noticed when writing to it
+                        ws.ping()
+                        continue
+                    if opcode == ABNF.OPCODE_CLOSE:
+                        return
+                    queue.put(decoder.decode(data))
+            except (OSError, WebSocketException):
+                pass
+            finally:
+                ws.close()
+    finally:
+        queue.put(_WS_FINISHED)
 
 
 def poll_run(repo_address: RepoAddress, job_heads: List[JobHead], backend: Backend):
@@ -3,6 +3,7 @@ import dstack.cli.commands.hub
 import dstack.cli.commands.init
 import dstack.cli.commands.logs
 import dstack.cli.commands.ls
+import dstack.cli.commands.migrate
 import dstack.cli.commands.ps
 import dstack.cli.commands.pull
 import dstack.cli.commands.push
@@ -446,6 +446,7 @@ class Job(JobHead):
 
 
 class JobSpec(JobRef):
+    job_id: Optional[str] = None
     image_name: str
     commands: Optional[List[str]] = None
     env: Optional[Dict[str, str]] = None
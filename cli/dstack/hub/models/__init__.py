@@ -2,7 +2,7 @@ from typing import Dict, List, Optional, Union
 
 from pydantic import BaseModel
 
-from dstack.core.job import Job
+from dstack.core.job import Job, JobHead
 from dstack.core.repo import LocalRepoData, RepoAddress
 
 
@@ -54,3 +54,10 @@ class RunsList(BaseModel):
 class JobsGet(BaseModel):
     repo_address: RepoAddress
     job_id: str
+
+
+class PollLogs(BaseModel):
+    repo_address: RepoAddress
+    job_heads: List[JobHead]
+    start_time: int
+    attached: bool
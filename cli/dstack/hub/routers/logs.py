@@ -1,10 +1,15 @@
-from typing import List, Union
+from typing import AsyncGenerator
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer
+from starlette.concurrency import iterate_in_threadpool
 
-from dstack.core.job import JobHead
-from dstack.core.repo import RepoAddress
+from dstack.core.log_event import LogEvent
+from dstack.hub.models import PollLogs
+from dstack.hub.routers.cache import get_backend
+from dstack.hub.routers.streams import LogStreamLagged, get_log_stream
+from dstack.hub.routers.util import get_hub
 from dstack.hub.security.scope import Scope
 
 router = APIRouter(prefix="/api/hub", tags=["logs"])
@@ -12,12 +17,27 @@ router = APIRouter(prefix="/api/hub", tags=["logs"])
 security = HTTPBearer()
 
 
-@router.get("/{hub_name}/logs/poll", dependencies=[Depends(Scope("logs:poll:read"))])
-async def poll_logs(
-    hub_name: str,
-    repo_address: RepoAddress,
-    job_heads: List[JobHead],
-    start_time: int,
-    attached: bool,
-):
-    pass
+@router.post("/{hub_name}/logs/poll", dependencies=[Depends(Scope("logs:poll:read"))])
+async def poll_logs(hub_name: str, body: PollLogs):
+    # Streams the logs as server-sent events. Attached clients of the same jobs share a single
+    # poller of the backend.
+    hub = await get_hub(hub_name=hub_name)
+    backend = get_backend(hub)
+    if body.attached:
+        events = get_log_stream(
+            hub_name, backend, body.repo_address, body.job_heads, body.start_time
+        ).subscribe(body.start_time)
+    else:
+        events = iterate_in_threadpool(
+            backend.poll_logs(body.repo_address, body.job_heads, body.start_time, attached=False)
+        )
+    return StreamingResponse(_server_sent_events(events), media_type="text/event-stream")
+
+
+async def _server_sent_events(events: AsyncGenerator[LogEvent, None]):
+    try:
+        async for event in events:
+            yield f"data: {event.json()}\n\n"
+    except LogStreamLagged:
+        # The client reconnects from the last event it got
+        yield "event: lagged\ndata: \n\n"
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+from collections import deque
+from typing import AsyncGenerator, Dict, List, Optional, Set, Tuple
+
+from dstack.backend.base import Backend
+from dstack.core.job import JobHead
+from dstack.core.log_event import LogEvent
+from dstack.core.repo import RepoAddress
+
+# Events kept for clients that connect after the stream has started
+REPLAY_BUFFER_SIZE = 10000
+
+# Clients that fall this far behind are disconnected, so that they don't hold up the others
+CLIENT_QUEUE_SIZE = 10000
+
+_FINISHED = object()
+
+_LAGGED = object()
+
+streams: Dict[Tuple, "LogStream"] = {}
+
+
+class LogStreamLagged(Exception):
+    # The client fell too far behind and was disconnected. It's expected to reconnect from the
+    # timestamp of the last event it got.
+    pass
+
+
+class LogStream:
+    # Polls the logs of a run once, in a thread, and fans the events out to all connected
+    # clients. Lives as long as it has clients and the run produces logs. Every client gets the
+    # events from its own start time on, which it can only share if the buffer still has them.
+    def __init__(
+        self,
+        key: Tuple,
+        backend: Backend,
+        repo_address: RepoAddress,
+        job_heads: List[JobHead],
+        start_time: int,
+    ):
+        self.key = key
+        self.start_time = start_time
+        self.buffer = deque(maxlen=REPLAY_BUFFER_SIZE)
+        self.finished = False
+        # The timestamp of the latest event that was dropped from the buffer
+        self._dropped_timestamp: Optional[int] = None
+        self._clients: Set[asyncio.Queue] = set()
+        self._loop = asyncio.get_running_loop()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._poll,
+            args=(backend, repo_address, job_heads, start_time),
+            daemon=True,
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def can_replay(self, start_time: int) -> bool:
+        return start_time >= self.start_time and (
+            self._dropped_timestamp is None or start_time > self._dropped_timestamp
+        )
+
+    def subscribe(self, start_time: int) -> AsyncGenerator[LogEvent, None]:
+        # The client is added right away rather than when the events are first read, so that the
+        # stream isn't closed by its last client leaving in between. The buffer is copied and the
+        # client is added without yielding to the event loop in between, so no event is missed
+        # or sent twice.
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        replay = [event for event in self.buffer if event.timestamp >= start_time]
+        finished = self.finished
+        if not finished:
+            self._clients.add(queue)
+        return self._events(queue, replay, finished, start_time)
+
+    async def _events(
+        self, queue: asyncio.Queue, replay: List[LogEvent], finished: bool, start_time: int
+    ) -> AsyncGenerator[LogEvent, None]:
+        try:
+            for event in replay:
+                yield event
+            while not finished:
+                event = await queue.get()
+                if event is _FINISHED:
+                    break
+                if event is _LAGGED:
+                    raise LogStreamLagged()
+                if event.timestamp >= start_time:
+                    yield event
+        finally:
+            self._clients.discard(queue)
+            if not self._clients:
+                self._close()
+
+    def _poll(
+        self,
+        backend: Backend,
+        repo_address: RepoAddress,
+        job_heads: List[JobHead],
+        start_time: int,
+    ):
+        try:
+            for event in backend.poll_logs(
+                repo_address, job_heads, start_time, attached=True, stopped=self._stopped
+            ):
+                if self._stopped.is_set():
+                    break
+                self._loop.call_soon_threadsafe(self._publish, event)
+        finally:
+            self._loop.call_soon_threadsafe(self._finish)
+
+    def _publish(self, event: LogEvent):
+        if len(self.buffer) == self.buffer.maxlen:
+            dropped = self.buffer[0].timestamp
+            if self._dropped_timestamp is None or dropped > self._dropped_timestamp:
+                self._dropped_timestamp = dropped
+        self.buffer.append(event)
+        for queue in list(self._clients):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._clients.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(_LAGGED)
+
+    def _finish(self):
+        self.finished = True
+        for queue in self._clients:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(_FINISHED)
+        self._clients.clear()
+        self._close()
+
+    def _close(self):
+        self._stopped.set()
+        if streams.get(self.key) is self:
+            del streams[self.key]
+
+
+def get_log_stream(
+    hub_name: str,
+    backend: Backend,
+    repo_address: RepoAddress,
+    job_heads: List[JobHead],
+    start_time: int,
+) -> LogStream:
+    # Clients that watch the same jobs share one stream, unless it can't replay their start time.
+    # Then they get a new stream, which takes the place of the old one for the clients to come.
+    key = (hub_name, repo_address.path(), tuple(sorted(h.job_id for h in job_heads)))
+    stream: Optional[LogStream] = streams.get(key)
+    if stream is None or not stream.can_replay(start_time):
+        stream = LogStream(key, backend, repo_address, job_heads, start_time)
+        streams[key] = stream
+        stream.start()
+    return stream
@@ -3,6 +3,7 @@ import sys
 import time
 from abc import abstractmethod
 from argparse import ArgumentParser, Namespace
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pkgutil import iter_modules
 from typing import Any, Dict, List, Optional, Union
 
@@ -10,11 +11,13 @@ from jinja2 import Template
 
 from dstack.api.repo import load_repo_data
 from dstack.backend.base import Backend
+from dstack.core.error import BackendError
 from dstack.core.job import (
     ArtifactSpec,
     DepSpec,
     GpusRequirements,
     Job,
+    JobRefId,
     JobSpec,
     JobStatus,
     Requirements,
@@ -22,6 +25,10 @@ from dstack.core.job import (
 from dstack.core.repo import RepoAddress, RepoData
 from dstack.utils.common import _quoted
 
+SUBMIT_JOBS_MAX_WORKERS = 8
+
+RESOLVE_DEPS_MAX_WORKERS = 8
+
 
 def _str_to_mib(s: str) -> int:
     ns = s.replace(" ", "").lower()
@@ -235,12 +242,14 @@ class Provider:
             raise Exception("The provider is not loaded")
         job_specs = self.create_job_specs()
         repo_data = load_repo_data()
-        # [TODO] Handle master job
-        jobs = []
+        # Lets the jobs of the workers refer to their master job
         for i, job_spec in enumerate(job_specs):
+            job_spec.set_id(f"{self.run_name},{self.workflow_name or ''},{i}")
+        jobs = []
+        for job_spec in job_specs:
             submitted_at = int(round(time.time() * 1000))
             job = Job(
-                job_id=f"{self.run_name},{self.workflow_name or ''},{i}",
+                job_id=job_spec.get_id(),
                 repo_data=repo_data,
                 run_name=self.run_name,
                 workflow_name=self.workflow_name or None,
@@ -259,14 +268,32 @@ class Provider:
                 host_name=None,
                 requirements=job_spec.requirements,
                 dep_specs=self.dep_specs,
-                master_job=job_spec.master_job,
+                master_job=JobRefId(job_id=job_spec.master_job.get_id())
+                if job_spec.master_job
+                else None,
                 app_specs=job_spec.app_specs,
                 runner_id=None,
                 request_id=None,
                 tag_name=tag_name,
             )
-            backend.submit_job(job)
             jobs.append(job)
+        # Master jobs are submitted first, so that their workers can find them
+        master_job_ids = set(job.master_job.get_id() for job in jobs if job.master_job)
+        submitted_jobs = []
+        failed_jobs = []
+        try:
+            for jobs_batch in [
+                [job for job in jobs if job.job_id in master_job_ids],
+                [job for job in jobs if job.job_id not in master_job_ids],
+            ]:
+                _submit_jobs_concurrently(backend, jobs_batch, submitted_jobs, failed_jobs)
+        except BaseException:
+            # Every job is rolled back even if others fail to, and the submission error is raised
+            for job in submitted_jobs:
+                _roll_back_job(backend, repo_data, job, submitted=True)
+            for job in failed_jobs:
+                _roll_back_job(backend, repo_data, job, submitted=False)
+            raise
         if tag_name:
             backend.add_tag_from_run(repo_data, tag_name, self.run_name, jobs)
         return jobs
@@ -274,9 +301,13 @@ class Provider:
     def _dep_specs(self, backend: Backend) -> Optional[List[DepSpec]]:
         if self.provider_data.get("deps"):
             repo_data = load_repo_data()
-            return [
-                self._parse_dep_spec(dep, backend, repo_data) for dep in self.provider_data["deps"]
-            ]
+            deps = self.provider_data["deps"]
+            with ThreadPoolExecutor(
+                max_workers=min(RESOLVE_DEPS_MAX_WORKERS, len(deps))
+            ) as executor:
+                return list(
+                    executor.map(lambda dep: self._parse_dep_spec(dep, backend, repo_data), deps)
+                )
         else:
             return None
 
@@ -349,22 +380,7 @@ class Provider:
     def _workflow_dep(
         backend: Backend, repo_address: RepoAddress, workflow_name: str, mount: bool
     ) -> DepSpec:
-        job_heads = sorted(
-            backend.list_job_heads(repo_address),
-            key=lambda j: j.submitted_at,
-            reverse=True,
-        )
-        run_name = next(
-            iter(
-                [
-                    job_head.run_name
-                    for job_head in job_heads
-                    if job_head.workflow_name == workflow_name
-                    and job_head.status == JobStatus.DONE
-                ]
-            ),
-            None,
-        )
+        run_name = backend.get_last_done_run_name(repo_address, workflow_name)
         if run_name:
             return DepSpec(repo_address=repo_address, run_name=run_name, mount=mount)
         else:
@@ -465,3 +481,49 @@ def get_provider_names() -> List[str]:
 
 def load_provider(provider_name) -> Provider:
     return importlib.import_module(f"dstack.providers.{provider_name}.main").__provider__()
+
+
+def _submit_jobs_concurrently(
+    backend: Backend, jobs: List[Job], submitted_jobs: List[Job], failed_jobs: List[Job]
+):
+    if not jobs:
+        return
+    errors = {}
+    with ThreadPoolExecutor(max_workers=min(SUBMIT_JOBS_MAX_WORKERS, len(jobs))) as executor:
+        futures = {executor.submit(backend.submit_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            job = futures[future]
+            try:
+                future.result()
+                submitted_jobs.append(job)
+            except BaseException as e:
+                errors[job.job_id] = e
+                # A job that failed after its instance was requested has to be stopped too, and
+                # one that failed before only leaves its head behind
+                if job.request_id:
+                    submitted_jobs.append(job)
+                else:
+                    failed_jobs.append(job)
+                # Jobs that haven't started yet aren't submitted
+                for f in futures:
+                    f.cancel()
+    if errors:
+        messages = set(str(e) for e in errors.values())
+        if len(messages) == 1:
+            raise next(iter(errors.values()))
+        raise BackendError(
+            "Failed to submit jobs: "
+            + "; ".join(f"{job_id}: {e}" for job_id, e in sorted(errors.items()))
+        )
+
+
+def _roll_back_job(backend: Backend, repo_data: RepoData, job: Job, submitted: bool):
+    try:
+        if submitted:
+            backend.stop_job(repo_data, job.job_id, abort=True)
+        else:
+            backend.delete_job_head(repo_data, job.job_id)
+    except Exception as e:
+        print(f"Failed to roll back the job {job.job_id}: {e}", file=sys.stderr)
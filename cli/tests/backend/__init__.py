@@ -0,0 +1,56 @@
+from collections import Counter
+from typing import Dict, List, Optional
+
+from dstack.backend.base.storage import Storage
+
+
+class CountingStorage(Storage):
+    # Records the keys that are written and deleted, counts the keys that are listed, and counts
+    # the requests by type as S3 would get them: one per object for puts and gets, one per call
+    # for listings and deletes
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self.put_keys = []
+        self.deleted_keys = []
+        self.listed_keys = 0
+        self.requests = Counter()
+
+    def put_object(self, key: str, content: str, metadata: Optional[Dict] = None):
+        self.put_keys.append(key)
+        self.requests["put"] += 1
+        self.storage.put_object(key, content, metadata)
+
+    def put_object_if_absent(self, key: str, content: str) -> bool:
+        self.put_keys.append(key)
+        self.requests["put"] += 1
+        return self.storage.put_object_if_absent(key, content)
+
+    def get_object(self, key: str) -> Optional[str]:
+        self.requests["get"] += 1
+        return self.storage.get_object(key)
+
+    def delete_object(self, key: str):
+        self.deleted_keys.append(key)
+        self.requests["delete"] += 1
+        self.storage.delete_object(key)
+
+    def iter_objects(self, keys_prefix: str, start_after: Optional[str] = None, limit=None):
+        self.requests["list"] += 1
+        for key in self.storage.iter_objects(keys_prefix, start_after, limit):
+            self.listed_keys += 1
+            yield key
+
+    def put_objects(self, objects: Dict[str, str]):
+        self.put_keys.extend(objects)
+        self.requests["put"] += len(objects)
+        self.storage.put_objects(objects)
+
+    def get_objects(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        self.requests["get"] += len(keys)
+        return self.storage.get_objects(keys)
+
+    def delete_objects(self, keys: List[str]):
+        self.deleted_keys.extend(keys)
+        if keys:
+            self.requests["delete"] += 1
+        self.storage.delete_objects(keys)
@@ -0,0 +1,40 @@
+import itertools
+import tempfile
+import unittest
+from pathlib import Path
+
+from tests.backend import CountingStorage
+
+from dstack.backend.base.cache import CachingStorage
+from dstack.backend.local.storage import LocalStorage
+
+
+class TestCachingStorage(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = CountingStorage(LocalStorage(Path(self._tmp_dir.name)))
+        self.cache = CachingStorage(self.storage, listings_ttl=60)
+        self.storage.put_objects({f"keys/k;{i:04}": "" for i in range(100)})
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_listing_stops_early(self):
+        keys = list(itertools.islice(self.cache.iter_objects("keys/k;"), 3))
+        self.assertEqual(keys, ["keys/k;0000", "keys/k;0001", "keys/k;0002"])
+        self.assertEqual(self.storage.listed_keys, 3)
+        # A listing that wasn't read to the end isn't cached
+        self.assertEqual(len(list(self.cache.iter_objects("keys/k;"))), 100)
+        self.assertEqual(self.storage.listed_keys, 103)
+
+    def test_complete_listing_is_cached(self):
+        list(self.cache.iter_objects("keys/k;"))
+        self.assertEqual(len(list(self.cache.iter_objects("keys/k;"))), 100)
+        self.assertEqual(self.storage.listed_keys, 100)
+
+    def test_listing_isnt_cached_after_concurrent_write(self):
+        listing = self.cache.iter_objects("keys/k;")
+        next(listing)
+        self.cache.put_object("keys/k;0000a", "")
+        list(listing)
+        self.assertIn("keys/k;0000a", list(self.cache.iter_objects("keys/k;")))
@@ -0,0 +1,98 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from tests.backend import CountingStorage
+
+from dstack.backend.base import jobs
+from dstack.backend.local.storage import LocalStorage
+from dstack.core.job import Job, JobStatus
+from dstack.core.repo import RepoData
+
+REPO_DATA = RepoData(
+    repo_host_name="github.com",
+    repo_port=None,
+    repo_user_name="user",
+    repo_name="repo",
+    repo_branch="main",
+    repo_hash="abc",
+    repo_diff=None,
+)
+
+
+def make_job(status: JobStatus) -> Job:
+    return Job(
+        job_id="run-1,train,0",
+        repo_data=REPO_DATA,
+        run_name="run-1",
+        workflow_name="train",
+        provider_name="bash",
+        local_repo_user_name="user",
+        local_repo_user_email=None,
+        status=status,
+        submitted_at=1600000000000,
+        image_name="ubuntu",
+        commands=["echo"],
+        env=None,
+        working_dir=None,
+        artifact_specs=None,
+        port_count=0,
+        ports=None,
+        host_name=None,
+        requirements=None,
+        dep_specs=None,
+        master_job=None,
+        app_specs=None,
+        runner_id=None,
+        request_id=None,
+        tag_name=None,
+    )
+
+
+class TestUpdateJobs(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = CountingStorage(LocalStorage(Path(self._tmp_dir.name)))
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_unchanged_job_head_is_not_written(self):
+        job = make_job(JobStatus.RUNNING)
+        jobs.create_job(self.storage, job)
+        self.storage.put_keys.clear()
+        self.storage.requests.clear()
+        jobs.update_job(self.storage, job)
+        # Only the job itself is written, not its head or the run manifest
+        self.assertEqual(
+            self.storage.put_keys, [jobs._get_job_filename(job.repo_address, job.job_id)]
+        )
+        self.assertEqual(self.storage.deleted_keys, [])
+        # The head is listed and the job written, where rewriting both took a list, a delete and
+        # two puts
+        self.assertEqual(self.storage.requests, {"list": 1, "put": 1})
+
+    def test_changed_job_head_is_replaced(self):
+        job = make_job(JobStatus.RUNNING)
+        jobs.create_job(self.storage, job)
+        old_head_key = jobs._get_job_head_filename(job)
+        self.storage.put_keys.clear()
+        self.storage.requests.clear()
+        job.status = JobStatus.DONE
+        jobs.update_job(self.storage, job)
+        self.assertEqual(
+            sorted(self.storage.put_keys),
+            sorted(
+                [
+                    jobs._get_job_head_filename(job),
+                    jobs._get_job_filename(job.repo_address, job.job_id),
+                ]
+            ),
+        )
+        self.assertEqual(self.storage.deleted_keys, [old_head_key])
+        # As many requests as rewriting the head and the job always took
+        self.assertEqual(self.storage.requests, {"list": 1, "delete": 1, "put": 2})
+        self.assertEqual(
+            [h.status for h in jobs.list_job_heads(self.storage, job.repo_address)],
+            [JobStatus.DONE],
+        )
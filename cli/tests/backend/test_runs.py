@@ -0,0 +1,134 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from tests.backend import CountingStorage
+from tests.backend.test_jobs import make_job
+
+from dstack.backend.base import BackendType, jobs, manifests, runs
+from dstack.backend.base.cache import CachingStorage
+from dstack.backend.local.storage import LocalStorage
+from dstack.core.job import Job, JobStatus
+
+
+def make_run_job(run_name: str, status: JobStatus, submitted_at: int) -> Job:
+    job = make_job(status)
+    job.job_id = f"{run_name},train,0"
+    job.run_name = run_name
+    job.submitted_at = submitted_at
+    return job
+
+
+class TestListRunHeads(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = CountingStorage(LocalStorage(Path(self._tmp_dir.name)))
+        self.jobs = [make_run_job(f"run-{i}", JobStatus.DONE, 1600000000000 + i) for i in range(5)]
+        for job in self.jobs:
+            jobs.create_job(self.storage, job)
+        self.repo_address = self.jobs[0].repo_address
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _list_run_names(self):
+        self.storage.put_keys.clear()
+        self.storage.deleted_keys.clear()
+        run_heads = runs.list_run_heads(
+            self.storage, None, self.repo_address, include_request_heads=False
+        )
+        # Listing runs never writes
+        self.assertEqual(self.storage.put_keys, [])
+        self.assertEqual(self.storage.deleted_keys, [])
+        return [r.run_name for r in run_heads]
+
+    def test_unindexed_runs_are_listed_from_job_heads(self):
+        self.assertEqual(self._list_run_names(), [f"run-{i}" for i in reversed(range(5))])
+        self.assertFalse(manifests.is_indexed(self.storage, self.repo_address))
+
+    def test_indexed_runs_are_listed_from_manifests(self):
+        runs.reindex_runs(self.storage, self.repo_address)
+        # A run deleted from job heads only is still listed from its manifest
+        self.storage.storage.delete_object(jobs._get_job_head_filename(self.jobs[0]))
+        self.assertEqual(self._list_run_names(), [f"run-{i}" for i in reversed(range(5))])
+
+    def test_unfinished_runs_are_listed_from_job_heads(self):
+        job = make_run_job("run-5", JobStatus.RUNNING, 1600000000005)
+        jobs.create_job(self.storage, job)
+        runs.reindex_runs(self.storage, self.repo_address)
+        # The runner updates the job head without touching the manifest
+        self.storage.storage.delete_object(jobs._get_job_head_filename(job))
+        job.status = JobStatus.DONE
+        self.storage.storage.put_object(jobs._get_job_head_filename(job), "")
+        self._list_run_names()
+        run_heads = runs.list_run_heads(
+            self.storage, None, self.repo_address, "run-5", include_request_heads=False
+        )
+        self.assertEqual(run_heads[0].status, JobStatus.DONE)
+        self.assertEqual(
+            manifests.list_unfinished_run_names(self.storage, self.repo_address), ["run-5"]
+        )
+        # The manifest is settled when the next run is submitted
+        runs.create_run(self.storage, self.repo_address, BackendType.LOCAL)
+        self.assertEqual(manifests.list_unfinished_run_names(self.storage, self.repo_address), [])
+        self.assertEqual(
+            manifests.get_last_done_run_name(self.storage, self.repo_address, "train"), "run-5"
+        )
+
+
+class TestRecentJobHeads(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = CountingStorage(LocalStorage(Path(self._tmp_dir.name)))
+        # 40 runs in each of three months, the latest month last
+        for month in range(3):
+            for i in range(40):
+                submitted_at = 1600000000000 + month * 31 * 24 * 3600 * 1000 + i
+                jobs.create_job(
+                    self.storage, make_run_job(f"run-{month}-{i}", JobStatus.DONE, submitted_at)
+                )
+        self.repo_address = make_job(JobStatus.DONE).repo_address
+        runs.reindex_runs(self.storage, self.repo_address)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_listing_stops_in_latest_partition(self):
+        self.storage.listed_keys = 0
+        cache = CachingStorage(self.storage)
+        job_head = next(runs.iter_recent_job_heads(cache, self.repo_address))
+        self.assertEqual(job_head.run_name, "run-2-39")
+        # Only the first batch of time index keys of the latest month is listed
+        self.assertEqual(self.storage.listed_keys, runs.RECENT_RUNS_BATCH_SIZE)
+
+
+class NonAtomicStorage(CountingStorage):
+    # Like S3 with a botocore that doesn't support conditional writes
+    def put_object_if_absent(self, key: str, content: str) -> bool:
+        raise NotImplementedError()
+
+
+class TestRunNames(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = CountingStorage(LocalStorage(Path(self._tmp_dir.name)))
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_claimed_indexes_are_skipped(self):
+        self.storage.put_object_if_absent("run-names/run/2", "")
+        self.assertEqual(runs._next_run_name_index(self.storage, "run"), 1)
+        self.assertEqual(runs._next_run_name_index(self.storage, "run"), 3)
+
+    def test_counter_without_atomic_creates(self):
+        storage = NonAtomicStorage(self.storage.storage)
+        self.assertEqual(runs._next_run_name_index(storage, "run"), 1)
+        self.assertEqual(runs._next_run_name_index(storage, "run"), 2)
+
+    def test_claims_of_deleted_runs_are_deleted(self):
+        for _ in range(3):
+            runs._next_run_name_index(self.storage, "run")
+        runs.delete_run_name_claims(self.storage, ["run-1", "run-3", "other-1"])
+        self.assertEqual(self.storage.deleted_keys, ["run-names/run/1"])
+        self.assertEqual(runs._next_run_name_index(self.storage, "run"), 4)
@@ -0,0 +1,25 @@
+import unittest
+
+import yaml
+
+from dstack.backend.base.serialization import dump_object, load_object
+from dstack.core.error import BackendError
+
+DATA = {"job_id": "run-1,train,0", "status": "done", "ports": [3000], "env": {"A": "ü"}}
+
+
+class TestSerialization(unittest.TestCase):
+    def test_versioned_object(self):
+        content = dump_object(DATA)
+        self.assertTrue(content.startswith("#dstack:1\n"))
+        self.assertEqual(load_object(content), DATA)
+        # The runner reads objects as YAML
+        self.assertEqual(yaml.safe_load(content), DATA)
+
+    def test_legacy_objects(self):
+        self.assertEqual(load_object(yaml.dump(DATA)), DATA)
+        self.assertEqual(load_object('{"count":3}'), {"count": 3})
+
+    def test_unknown_version(self):
+        with self.assertRaises(BackendError):
+            load_object('#dstack:2\n{"count":3}')
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from dstack.backend.base import secrets
+from dstack.backend.local.secrets import LocalSecretsManager
+from dstack.backend.local.sqlite import SQLiteStorage
+from dstack.core.repo import RepoAddress
+from dstack.core.secret import Secret
+
+REPO_ADDRESS = RepoAddress(
+    repo_host_name="github.com", repo_port=None, repo_user_name="user", repo_name="repo"
+)
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.root_path = Path(self._tmp_dir.name)
+        self.storage = SQLiteStorage(self.root_path)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_add_secret_writes_head_file(self):
+        # The runner lists secret heads on disk
+        secrets.add_secret(
+            self.storage,
+            LocalSecretsManager(self.root_path),
+            REPO_ADDRESS,
+            Secret(secret_name="TOKEN", secret_value="value"),
+        )
+        head_path = os.path.join(self.root_path, "secrets", REPO_ADDRESS.path(), "l;TOKEN")
+        self.assertTrue(os.path.isfile(head_path))
+        self.assertEqual(secrets.list_secret_names(self.storage, REPO_ADDRESS), ["TOKEN"])
+
+    def test_secret_heads_in_database_are_moved_to_files(self):
+        key = f"secrets/{REPO_ADDRESS.path()}/l;TOKEN"
+        SQLiteStorage(self.root_path, files_keys_prefixes=[]).put_object(key, "")
+        self.storage.move_files_keys_to_files()
+        self.assertEqual(secrets.list_secret_names(self.storage, REPO_ADDRESS), ["TOKEN"])
+        self.assertTrue(os.path.isfile(os.path.join(self.root_path, key)))
+
+    def test_run_keys_are_stored_in_database(self):
+        self.storage.put_object("runs/repo/l;run-1", "content")
+        self.assertEqual(self.storage.get_object("runs/repo/l;run-1"), "content")
+        self.assertFalse(os.path.exists(os.path.join(self.root_path, "runs")))
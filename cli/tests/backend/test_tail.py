@@ -0,0 +1,53 @@
+import os
+import tempfile
+import time
+import unittest
+
+from dstack.backend.local.tail import INDEX_RECORD, FileTail, LogIndex
+
+
+class TestLogIndex(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self._tmp_dir.name, "run.log")
+        self.now = int(time.time() * 1000)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write_log(self, chunks, modified_at):
+        with open(self.log_path, "w") as f:
+            for chunk in chunks:
+                f.write("".join(f"{line}\n" for line in chunk))
+        os.utime(self.log_path, (modified_at / 1000, modified_at / 1000))
+
+    def test_seek_into_log_never_tailed(self):
+        modified_at = self.now - 60 * 1000
+        self._write_log([[f"line {i}" for i in range(1000)]], modified_at)
+        index = LogIndex(self.log_path)
+        self.assertEqual(index.find_offset(modified_at - 1000), 0)
+        self.assertEqual(index.find_offset(modified_at + 1000), os.path.getsize(self.log_path))
+        # The index is built by the first lookup and persisted
+        self.assertEqual(os.path.getsize(index.path), INDEX_RECORD.size)
+        index = LogIndex(self.log_path)
+        self.assertEqual(index.find_offset(modified_at + 1000), os.path.getsize(self.log_path))
+        self.assertEqual(os.path.getsize(index.path), INDEX_RECORD.size)
+
+    def test_seek_with_runner_records(self):
+        chunks = [[f"chunk {i} line {j}" for j in range(100)] for i in range(10)]
+        self._write_log(chunks, self.now - 10 * 1000)
+        offset = 0
+        with open(self.log_path + ".idx", "wb") as f:
+            for i, chunk in enumerate(chunks):
+                offset += sum(len(line) + 1 for line in chunk)
+                f.write(INDEX_RECORD.pack(self.now - (60 - i) * 1000, offset))
+        offset = LogIndex(self.log_path).find_offset(self.now - (60 - 5) * 1000 + 500)
+        lines = FileTail(self.log_path, offset).read_lines()
+        self.assertEqual(lines[0], "chunk 6 line 0\n")
+        self.assertEqual(len(lines), 400)
+
+    def test_log_being_written_isnt_indexed(self):
+        self._write_log([["line"]], self.now)
+        index = LogIndex(self.log_path)
+        self.assertEqual(index.find_offset(self.now + 1000), 0)
+        self.assertFalse(os.path.exists(index.path))
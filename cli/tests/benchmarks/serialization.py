@@ -0,0 +1,71 @@
+# Compares storing jobs as YAML, as before, with compact JSON as dump_object does.
+# Run from the cli directory: python -m tests.benchmarks.serialization
+import timeit
+
+import yaml
+
+from dstack.backend.base.serialization import dump_object, load_object
+from dstack.core.app import AppSpec
+from dstack.core.artifact import ArtifactSpec
+from dstack.core.job import Job, JobStatus
+from dstack.core.repo import RepoData
+
+NUMBER = 2000
+
+
+def make_job() -> Job:
+    return Job(
+        job_id="run-1,train,0",
+        repo_data=RepoData(
+            repo_host_name="github.com",
+            repo_port=None,
+            repo_user_name="user",
+            repo_name="repo",
+            repo_branch="main",
+            repo_hash="0123456789abcdef0123456789abcdef01234567",
+            repo_diff=None,
+        ),
+        run_name="run-1",
+        workflow_name="train",
+        provider_name="bash",
+        local_repo_user_name="user",
+        local_repo_user_email="user@example.com",
+        status=JobStatus.RUNNING,
+        submitted_at=1600000000000,
+        image_name="python:3.10",
+        commands=["pip install -r requirements.txt", "python train.py --epochs 10"],
+        env={"PYTHONUNBUFFERED": "1", "WANDB_MODE": "offline"},
+        working_dir="src",
+        artifact_specs=[ArtifactSpec(artifact_path="checkpoints", mount=False)],
+        port_count=1,
+        ports=[8888],
+        host_name="10.0.0.1",
+        requirements=None,
+        dep_specs=None,
+        master_job=None,
+        app_specs=[AppSpec(port_index=0, app_name="tensorboard")],
+        runner_id="runner-1",
+        request_id="sir-1",
+        tag_name=None,
+    )
+
+
+def main():
+    data = make_job().serialize()
+    yaml_content = yaml.dump(data)
+    json_content = dump_object(data)
+    cases = [
+        ("yaml.dump", lambda: yaml.dump(data)),
+        ("dump_object", lambda: dump_object(data)),
+        ("yaml.load FullLoader", lambda: yaml.load(yaml_content, yaml.FullLoader)),
+        ("load_object YAML", lambda: load_object(yaml_content)),
+        ("load_object JSON", lambda: load_object(json_content)),
+    ]
+    print(f"YAML {len(yaml_content)} bytes, JSON {len(json_content)} bytes")
+    for name, f in cases:
+        secs = min(timeit.repeat(f, number=NUMBER, repeat=3))
+        print(f"{name:24} {secs / NUMBER * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -512,11 +512,11 @@ func uniqueMount(m []mount.Mount) []mount.Mount {
 	return result
 }
 
-func createLocalLog(dir, fileName string) (*os.File, error) {
+func createLocalLog(dir, fileName string) (*indexedLog, error) {
 	if _, err := os.Stat(dir); err != nil {
 		os.MkdirAll(dir, 0777)
 	}
-	fileLog, err := os.OpenFile(filepath.Join(dir, fmt.Sprintf("%s.log", fileName)), os.O_RDWR|os.O_CREATE|os.O_APPEND, 0o777)
+	fileLog, err := newIndexedLog(filepath.Join(dir, fmt.Sprintf("%s.log", fileName)))
 	if err != nil {
 		return nil, gerrors.Wrap(err)
 	}
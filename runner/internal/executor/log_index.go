@@ -0,0 +1,81 @@
+package executor
+
+import (
+	"bytes"
+	"encoding/binary"
+	"os"
+	"time"
+
+	"github.com/dstackai/dstack/runner/internal/gerrors"
+)
+
+// indexRate is the minimal interval between records of a log index
+const indexRate = time.Second
+
+// indexedLog appends to a log file and keeps a sparse index of it in <log>.idx, which the CLI
+// uses to start reading the log at a time. A record is two little-endian int64: a timestamp in
+// milliseconds and the offset of the end of the last complete line written by then.
+type indexedLog struct {
+	file          *os.File
+	index         *os.File
+	lineOffset    int64
+	offset        int64
+	indexedOffset int64
+	indexedAt     time.Time
+}
+
+func newIndexedLog(path string) (*indexedLog, error) {
+	file, err := os.OpenFile(path, os.O_RDWR|os.O_CREATE|os.O_APPEND, 0o777)
+	if err != nil {
+		return nil, gerrors.Wrap(err)
+	}
+	info, err := file.Stat()
+	if err != nil {
+		_ = file.Close()
+		return nil, gerrors.Wrap(err)
+	}
+	index, err := os.OpenFile(path+".idx", os.O_WRONLY|os.O_CREATE|os.O_APPEND, 0o777)
+	if err != nil {
+		_ = file.Close()
+		return nil, gerrors.Wrap(err)
+	}
+	return &indexedLog{
+		file:          file,
+		index:         index,
+		lineOffset:    info.Size(),
+		offset:        info.Size(),
+		indexedOffset: info.Size(),
+	}, nil
+}
+
+func (l *indexedLog) Write(p []byte) (int, error) {
+	n, err := l.file.Write(p)
+	if i := bytes.LastIndexByte(p[:n], '\n'); i >= 0 {
+		l.lineOffset = l.offset + int64(i) + 1
+	}
+	l.offset += int64(n)
+	if now := time.Now(); now.Sub(l.indexedAt) >= indexRate {
+		l.writeRecord(now)
+	}
+	return n, err
+}
+
+func (l *indexedLog) Close() error {
+	l.writeRecord(time.Now())
+	_ = l.index.Close()
+	return l.file.Close()
+}
+
+func (l *indexedLog) writeRecord(now time.Time) {
+	if l.lineOffset <= l.indexedOffset {
+		return
+	}
+	record := make([]byte, 16)
+	binary.LittleEndian.PutUint64(record[:8], uint64(now.UnixNano()/int64(time.Millisecond)))
+	binary.LittleEndian.PutUint64(record[8:], uint64(l.lineOffset))
+	// The index is only a hint for readers, so it doesn't fail the log
+	if _, err := l.index.Write(record); err == nil {
+		l.indexedOffset = l.lineOffset
+		l.indexedAt = now
+	}
+}
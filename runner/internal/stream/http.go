@@ -105,7 +105,13 @@ func (s *Server) getLogs(w http.ResponseWriter, r *http.Request) {
 			s.mu.RUnlock()
 			continue
 		}
-		_ = connection.WriteMessage(websocket.TextMessage, s.buf[currentPos])
+		// The position is kept only for lines that were written, so that a client that
+		// reconnects after a failed write gets them again
+		if err := connection.WriteMessage(websocket.TextMessage, s.buf[currentPos]); err != nil {
+			s.mu.RUnlock()
+			_ = connection.Close()
+			return
+		}
 		currentPos++
 		s.mu.RUnlock()
 		if hasID {
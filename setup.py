@@ -71,7 +71,6 @@ setup(
         "py-cpuinfo",
         "psutil",
         "jinja2",
-        "pygtail",
     ],
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",